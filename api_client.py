@@ -0,0 +1,139 @@
+"""Thin client for api_server.py, used by the Streamlit UI when CHATBOT_API_URL is set"""
+import json
+import os
+import threading
+
+# Base URL of api_server.py; a bare host:port (as Render's fromService gives) means http://
+API_URL = os.environ.get("CHATBOT_API_URL", "")
+API_TIMEOUT = float(os.environ.get("CHATBOT_API_TIMEOUT", "90"))
+
+
+class RemoteTurn:
+    """A chat turn streamed from the API, with the same surface as chat_pipeline.ChatTurn"""
+
+    def __init__(self, client, payload, api_key, model):
+        self.model = model
+        self.platforms = {}
+        self.timings = {}
+        self.profile_path = None
+        self._client = client
+        self._payload = payload
+        self._api_key = api_key
+        self._response = None
+
+    def tokens(self):
+        """Yield answer text from the SSE stream; abandoning the generator cancels the turn"""
+        import httpx
+
+        headers = {"Authorization": f"Bearer {self._api_key}"} if self._api_key else {}
+        try:
+            request = self._client.build_request("POST", "/v1/chat", json=self._payload, headers=headers)
+            self._response = self._client.send(request, stream=True)
+            if self._response.status_code != 200:
+                self._response.read()
+                yield f"⚠️ Error: {self._response.status_code} {self._response.text}"
+                return
+            event = None
+            for line in self._response.iter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    if event == "token":
+                        yield data
+                    elif event == "platforms":
+                        self.platforms = data
+                    elif event == "done":
+                        self.model = data.get("model", self.model)
+                        self.timings = data.get("timings", {})
+                        self.profile_path = data.get("profile")
+        except httpx.HTTPError as e:
+            yield f"⚠️ Error: {str(e)}"
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Close the stream; the server cancels the turn when the connection drops"""
+        if self._response is not None:
+            self._response.close()
+
+
+class ApiClient:
+    """Chat turns and conversation history over HTTP.
+
+    The history methods mirror HistoryStore, so the UI can use either. httpx
+    is only imported once a client is made, so the UI without an API skips it."""
+
+    def __init__(self, base_url=API_URL, timeout=API_TIMEOUT):
+        import httpx
+
+        if "://" not in base_url:
+            base_url = f"http://{base_url}"
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(base_url=self.base_url, timeout=httpx.Timeout(timeout, connect=5.0))
+
+    def health(self):
+        response = self._client.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+    def start_turn(self, user_query, model, api_key, history=(), profile=False):
+        payload = {"query": user_query, "model": model, "history": list(history), "profile": profile}
+        return RemoteTurn(self._client, payload, api_key, model)
+
+    def list_conversations(self, limit=20):
+        response = self._client.get("/v1/conversations", params={"limit": limit})
+        response.raise_for_status()
+        return response.json()
+
+    def load(self, conv_id):
+        response = self._client.get(f"/v1/conversations/{conv_id}/messages")
+        return response.json() if response.status_code == 200 else None
+
+    def load_tail(self, conv_id, count):
+        response = self._client.get(f"/v1/conversations/{conv_id}/tail", params={"count": count})
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return data["offset"], data["messages"]
+
+    def read_messages(self, conv_id, start, stop):
+        response = self._client.get(f"/v1/conversations/{conv_id}/messages",
+                                    params={"start": start, "stop": stop})
+        response.raise_for_status()
+        return response.json()
+
+    def save(self, conv_id, title, timestamp, messages, model, offset=0, replace=False):
+        response = self._client.put(f"/v1/conversations/{conv_id}", json={
+            "title": title, "timestamp": timestamp, "messages": messages, "model": model, "offset": offset,
+            "replace": replace,
+        })
+        response.raise_for_status()
+
+    def close(self, conv_id):
+        if conv_id is not None:
+            self._client.post(f"/v1/conversations/{conv_id}/close")
+
+    def delete(self, conv_id):
+        import httpx
+
+        try:
+            response = self._client.delete(f"/v1/conversations/{conv_id}")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            # HistoryStore.delete callers expect an OSError
+            raise OSError(str(e)) from e
+
+
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client():
+    """Return the API client shared by every session, None when CHATBOT_API_URL is unset"""
+    global _api_client
+    if _api_client is None and API_URL:
+        with _api_client_lock:
+            if _api_client is None:
+                _api_client = ApiClient()
+    return _api_client
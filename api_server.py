@@ -0,0 +1,242 @@
+"""Headless HTTP API over the chatbot pipeline, with server-sent-event streaming.
+
+    python api_server.py --workers 4 --port 8000
+    CHATBOT_API_URL=http://127.0.0.1:8000 streamlit run travel_guide_chatbot.py
+
+The saved index is built (or refreshed) once before the workers start; each
+worker then memory-maps the same read-only index files, so the OS shares one
+copy of the vectors between them.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from caching import get_semantic_cache
+from chat_pipeline import start_turn
+from history_store import get_history_store
+from knowledge_base import get_knowledge_base
+from metrics import get_metrics
+from startup import get_startup
+from travel_platforms import TRAVEL_PLATFORMS, get_platform_suggestions
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+ALLOWED_MODELS = {"llama-3.1-8b-instant", "llama-3.1-70b-versatile"}
+# Messages of a stored conversation summarized into the prompt
+HISTORY_WINDOW = 20
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the index and models in the background; /health answers meanwhile
+    get_startup()
+    yield
+
+
+app = FastAPI(title="Travel Guide Chatbot API", lifespan=lifespan)
+
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 2
+
+
+class PlatformRequest(BaseModel):
+    query: str
+
+
+class ChatRequest(BaseModel):
+    query: str
+    model: str = DEFAULT_MODEL
+    # Earlier messages, for clients that keep the transcript themselves
+    history: list[dict] = []
+    # Persist the question and answer to this conversation, reading history from it
+    conversation_id: str | None = None
+    profile: bool = False
+
+
+class SaveRequest(BaseModel):
+    title: str | None = None
+    timestamp: str
+    messages: list[dict]
+    model: str | None = None
+    offset: int = 0
+    # The transcript was cleared: overwrite the log from offset on
+    replace: bool = False
+
+
+def _api_key(request):
+    """Groq key from "Authorization: Bearer gsk_…", else the server's GROQ_API_KEY"""
+    header = request.headers.get("authorization", "")
+    key = header[7:].strip() if header.lower().startswith("bearer ") else ""
+    key = key or os.environ.get("GROQ_API_KEY", "")
+    if not key:
+        raise HTTPException(401, "Groq API key required")
+    return key
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/health")
+def health():
+    startup = get_startup()
+    return {"status": "ok", "ready": startup.ready.is_set(), "stage": startup.stage,
+            "error": repr(startup.error) if startup.error else None}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return get_metrics().prometheus_text()
+
+
+@app.post("/v1/search")
+def search(body: SearchRequest):
+    """rag_search: the context chunks retrieved for a query"""
+    _, chunks = get_knowledge_base().retrieve(body.query, k=body.k)
+    return {"chunks": chunks}
+
+
+@app.post("/v1/platforms")
+def platforms(body: PlatformRequest):
+    """get_platform_suggestions: booking platforms for the query's intents"""
+    return {"platforms": get_platform_suggestions(body.query)}
+
+
+@app.get("/v1/platforms")
+def all_platforms():
+    return {"platforms": TRAVEL_PLATFORMS}
+
+
+@app.post("/v1/chat")
+async def chat(body: ChatRequest, request: Request):
+    """generate_response as a server-sent-event stream.
+
+    Events: "token" (answer text), "platforms" (matched booking platforms)
+    and "done" (model, timings); a closed connection cancels the turn."""
+    if body.model not in ALLOWED_MODELS:
+        raise HTTPException(400, f"Unknown model {body.model!r}")
+    api_key = _api_key(request)
+    store = get_history_store()
+    history = body.history
+    offset = 0
+    if body.conversation_id:
+        loaded = await asyncio.to_thread(store.load_tail, body.conversation_id, HISTORY_WINDOW)
+        tail_offset, saved = loaded or (0, [])
+        history = saved or history
+        offset = tail_offset + len(saved)
+
+    turn = start_turn(body.query, body.model, api_key, get_knowledge_base(), get_platform_suggestions,
+                      get_semantic_cache(), history, profile=body.profile,
+                      consumer_loop=asyncio.get_running_loop())
+
+    async def events():
+        parts = []
+        async for text in turn.atokens():
+            parts.append(text)
+            yield _sse("token", text)
+        if turn.platforms:
+            yield _sse("platforms", turn.platforms)
+        timings = {name: round(seconds, 3) for name, seconds in turn.timings.items()}
+        # A turn that failed before its first token has no ttft; the UI shows total for it
+        timings.setdefault("ttft", timings.get("total", 0.0))
+        if body.conversation_id:
+            messages = [{"role": "user", "content": body.query},
+                        {"role": "assistant", "content": "".join(parts), "timings": timings}]
+            title = None if offset else body.query[:50] + ("..." if len(body.query) > 50 else "")
+            # Disk writes and fsync off the event loop, so other streams keep flowing
+            await asyncio.to_thread(store.save, body.conversation_id, title, datetime.now().isoformat(),
+                                    messages, turn.model, offset=offset)
+            # Another worker may append to this conversation next
+            await asyncio.to_thread(store.close, body.conversation_id)
+        yield _sse("done", {"model": turn.model, "timings": timings,
+                            "profile": str(turn.profile_path) if turn.profile_path else None})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/v1/conversations")
+def list_conversations(limit: int = 20):
+    return get_history_store().list_conversations(limit=limit)
+
+
+@app.get("/v1/conversations/{conv_id}/tail")
+def conversation_tail(conv_id: str, count: int = 20):
+    result = get_history_store().load_tail(conv_id, count)
+    if result is None:
+        raise HTTPException(404, "Conversation not found")
+    offset, messages = result
+    return {"offset": offset, "messages": messages}
+
+
+@app.get("/v1/conversations/{conv_id}/messages")
+def conversation_messages(conv_id: str, start: int = 0, stop: int | None = None):
+    store = get_history_store()
+    if stop is None:
+        messages = store.load(conv_id)
+        if messages is None:
+            raise HTTPException(404, "Conversation not found")
+        return messages[start:]
+    return store.read_messages(conv_id, start, stop)
+
+
+@app.put("/v1/conversations/{conv_id}")
+def save_conversation(conv_id: str, body: SaveRequest):
+    store = get_history_store()
+    store.save(conv_id, body.title, body.timestamp, body.messages, body.model, offset=body.offset,
+               replace=body.replace)
+    # Workers don't share open log handles, so release it for whichever serves the next save
+    store.close(conv_id)
+    return {"saved": len(body.messages)}
+
+
+@app.post("/v1/conversations/{conv_id}/close")
+def close_conversation(conv_id: str):
+    get_history_store().close(conv_id)
+    return {"closed": conv_id}
+
+
+@app.delete("/v1/conversations/{conv_id}")
+def delete_conversation(conv_id: str):
+    get_history_store().delete(conv_id)
+    return {"deleted": conv_id}
+
+
+def _build_index():
+    get_knowledge_base().get_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("API_WORKERS", "2")))
+    args = parser.parse_args()
+
+    import uvicorn
+
+    # Build or refresh the index once, so workers only ever mmap finished files;
+    # in a child process, so this supervisor doesn't keep the model in memory
+    start = time.perf_counter()
+    builder = multiprocessing.get_context("spawn").Process(target=_build_index)
+    builder.start()
+    builder.join()
+    if builder.exitcode != 0:
+        # Every worker would otherwise rebuild the index at once
+        raise SystemExit(f"Index build failed (exit code {builder.exitcode}), not starting workers ❌")
+    print(f"Index ready in {time.perf_counter() - start:.1f}s, starting {args.workers} workers 🚀")
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
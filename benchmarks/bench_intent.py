@@ -0,0 +1,78 @@
+"""Compare the compiled intent matcher with the original substring scan.
+
+    python benchmarks/bench_intent.py --categories 5 200 1000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from intent_matcher import IntentMatcher  # noqa: E402
+from travel_platforms import INTENT_KEYWORDS  # noqa: E402
+
+QUERIES = [
+    "Book hotel in Mumbai",
+    "Flight tickets Delhi to Bangalore",
+    "Plan a 5-day trip to Goa",
+    "Tourist places in Kerala",
+    "Cheapest bus from Chennai to Ooty tomorrow night",
+    "Is there a train with sleeper class to Jaipur?",
+    "My car needs repair before an overseas holiday",
+    "What should I see in Paris in three days with kids and a small budget?",
+]
+
+
+def legacy_match(keyword_table, query):
+    """The original get_platform_suggestions: one any() substring scan per category"""
+    query_lower = query.lower()
+    return [
+        category for category, words in keyword_table.items()
+        if any(word in query_lower for word in words)
+    ]
+
+
+def synthetic_table(categories, synonyms=20, seed=7):
+    """INTENT_KEYWORDS plus made-up categories until there are `categories` of them"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    table = dict(INTENT_KEYWORDS)
+    while len(table) < categories:
+        words = ["".join(rng.choices(letters, k=rng.randint(5, 10))) for _ in range(synonyms)]
+        table[f"Category {len(table)}"] = words
+    return table
+
+
+def per_query_us(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", type=int, nargs="+", default=[5, 100, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'categories':>10} {'keywords':>9} {'legacy µs/q':>12} {'matcher µs/q':>13} {'speed-up':>9}")
+    for categories in args.categories:
+        table = synthetic_table(categories)
+        matcher = IntentMatcher(table)
+        keywords = sum(len(words) for words in table.values())
+        legacy = per_query_us(lambda q: legacy_match(table, q), QUERIES, args.repeat)
+        compiled = per_query_us(matcher.match, QUERIES, args.repeat)
+        print(f"{len(table):>10} {keywords:>9} {legacy:>12.1f} {compiled:>13.1f} {legacy / compiled:>8.1f}x")
+
+    print("\nBehaviour on the sample queries (legacy → matcher):")
+    matcher = IntentMatcher(INTENT_KEYWORDS)
+    for query in QUERIES:
+        print(f"  {query!r}: {legacy_match(INTENT_KEYWORDS, query)} → {matcher.match(query)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""Offline benchmarks for the retrieval and response pipeline, written as JSON.
+
+    python benchmarks/bench_pipeline.py --rows 10000 100000 --output bench.json
+    python benchmarks/bench_pipeline.py --rows 10000 --compare bench.json
+
+Everything runs in a temporary directory against a synthetic travel.csv; the
+Groq API is replaced by fake_groq_server.py with --llm-latency. The index
+section reports recall@k and latency of each compact INDEX_MODE against
+exact search, over a sweep of its query-time knob:
+
+    python benchmarks/bench_pipeline.py --skip corpus intent history pipeline --nprobe 8 32 128
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SYLLABLES = ["ka", "la", "mor", "va", "ri", "ta", "pur", "gao", "nad", "ban", "del", "ko", "shi", "man", "ur"]
+VOCAB = ["beaches", "temples", "museum", "fort", "lake", "hills", "tea", "gardens", "nightlife", "market",
+         "waterfall", "trek", "backwaters", "houseboat", "palace", "desert", "safari", "churches", "food",
+         "street", "festival", "river", "island", "caves", "monastery", "wildlife", "sunset", "harbour"]
+OPEN_QUERIES = ["quiet hill station with tea gardens", "best places for street food and markets",
+                "where can I see wildlife on a safari", "romantic city with museums",
+                "cheap beach holiday with nightlife", "temples and old forts to visit",
+                "waterfall trek near a lake", "houseboat stay on the backwaters"]
+INTENT_QUERIES = ["Book hotel in Mumbai", "Flight tickets Delhi to Bangalore", "Plan a 5-day trip to Goa",
+                  "Tourist places in Kerala", "Cheapest bus from Chennai to Ooty tomorrow night",
+                  "Is there a train with sleeper class to Jaipur?", "What should I see in Paris?"]
+
+
+def percentiles(samples):
+    """p50/p95/p99/mean in milliseconds"""
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "mean_ms": statistics.fmean(ordered) * 1000, "samples": len(ordered)}
+
+
+def rss_mb():
+    """Current resident set size"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def dir_size_mb(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file()) / 2**20
+
+
+def place_name(i, rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize() + f" {i}"
+
+
+def write_corpus(path, rows, seed=7):
+    """travel.csv-shaped file with `rows` synthetic places; returns the place names"""
+    import csv
+
+    rng = random.Random(seed)
+    names = []
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["place", "info"])
+        for i in range(rows):
+            name = place_name(i, rng)
+            names.append(name)
+            info = f"{name} " + " ".join(rng.choices(VOCAB, k=rng.randint(6, 16))) + "."
+            writer.writerow([name, info])
+    return names
+
+
+def timed_calls(fn, args_list, concurrency=1):
+    """(latencies, wall seconds) of fn(*args) over args_list"""
+    def one(args):
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [one(args) for args in args_list]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(one, args_list))
+    return latencies, time.perf_counter() - start
+
+
+def bench_corpus(rows, args, workdir):
+    """Index build, reload, memory and rag_search latency for one corpus size"""
+    import knowledge_base as kb
+
+    corpus_dir = workdir / f"corpus_{rows}"
+    corpus_dir.mkdir()
+    csv_path = corpus_dir / "travel.csv"
+    names = write_corpus(csv_path, rows)
+    kb.INDEX_DIR = corpus_dir / "index"
+
+    knowledge_base = kb.KnowledgeBase(csv_path, corpus_dir / "missing.pdf")
+    start = time.perf_counter()
+    knowledge_base.embeddings
+    model_seconds = time.perf_counter() - start
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    knowledge_base.get_db()
+    build_seconds = time.perf_counter() - start
+    result = {
+        "rows": rows,
+        "model_load_seconds": model_seconds,
+        "build_seconds": build_seconds,
+        "build_rows_per_second": rows / build_seconds,
+        "rss_growth_mb": rss_mb() - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "index_disk_mb": dir_size_mb(kb.INDEX_DIR),
+    }
+
+    reloaded = kb.KnowledgeBase(csv_path, corpus_dir / "missing.pdf")
+    reloaded._embeddings = knowledge_base._embeddings
+    reloaded._reranker = knowledge_base.reranker
+    start = time.perf_counter()
+    reloaded.get_db()
+    result["load_seconds"] = time.perf_counter() - start
+
+    rng = random.Random(11)
+    named = [f"Tell me about {rng.choice(names)}" for _ in range(args.queries)]
+    open_ended = [f"{rng.choice(OPEN_QUERIES)} #{i}" for i in range(args.queries)]
+    result["rag_search"] = {}
+    for k in args.ks:
+        for kind, queries in (("named_place", named), ("open_ended", open_ended)):
+            for concurrency in args.concurrency:
+                # Unique queries and a cleared cache, so every call does the full search
+                reloaded.search_cache.clear()
+                latencies, wall = timed_calls(reloaded.retrieve, [(q, k) for q in queries], concurrency)
+                stats = percentiles(latencies)
+                stats["qps"] = len(queries) / wall
+                result["rag_search"][f"k={k} {kind} c={concurrency}"] = stats
+        reloaded.search_cache.clear()
+        repeat = [(open_ended[0], k)] * args.queries
+        latencies, wall = timed_calls(reloaded.retrieve, repeat)
+        stats = percentiles(latencies)
+        stats["qps"] = len(repeat) / wall
+        result["rag_search"][f"k={k} cached"] = stats
+
+    # Query encoding alone: one forward pass per call vs the micro-batcher
+    embeddings = knowledge_base.embeddings
+    batch_size = embeddings.query_batch_size
+    result["embed_query"] = {}
+    for setting in (1, batch_size):
+        embeddings.query_batch_size = setting
+        for concurrency in args.concurrency:
+            latencies, wall = timed_calls(embeddings.embed_query, [(q,) for q in open_ended], concurrency)
+            stats = percentiles(latencies)
+            stats["qps"] = len(open_ended) / wall
+            result["embed_query"][f"batch={setting} c={concurrency}"] = stats
+    embeddings.query_batch_size = batch_size
+    return result
+
+
+def bench_index(args):
+    """recall@k, latency and size of each compact INDEX_MODE against the exact flat index"""
+    import faiss
+    import numpy as np
+
+    import knowledge_base as kb
+    import vector_index
+
+    rng = random.Random(5)
+    texts = [f"{place_name(i, rng)} " + " ".join(rng.choices(VOCAB, k=rng.randint(6, 16)))
+             for i in range(args.index_rows + args.queries)]
+    embeddings = kb.KnowledgeBase().embeddings
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    # Held-out texts from the same distribution serve as queries
+    corpus, queries = vectors[:args.index_rows], vectors[args.index_rows:]
+
+    exact = faiss.IndexFlatL2(corpus.shape[1])
+    exact.add(corpus)
+
+    def measure(index):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query[None, :], max(args.ks))
+            latencies.append(time.perf_counter() - start)
+        stats = percentiles(latencies)
+        for k in args.ks:
+            stats[f"recall_at_{k}"] = vector_index.recall_at_k(exact, index, queries, k)
+        return stats
+
+    result = {"rows": args.index_rows, "flat": measure(exact)}
+    result["flat"]["index_mb"] = vector_index.index_bytes(exact) / 1e6
+    vector_index.INDEX_MIN_DOCUMENTS = 0
+    for mode, knob, values in (("hnsw_sq", "ef_search", args.ef_search), ("ivfpq", "nprobe", args.nprobe)):
+        start = time.perf_counter()
+        index = vector_index.compact_index(exact, mode)
+        build_seconds = time.perf_counter() - start
+        size_mb = vector_index.index_bytes(index) / 1e6
+        for value in values:
+            vector_index.configure_search(index, **{knob: value})
+            stats = measure(index)
+            stats["build_seconds"] = build_seconds
+            stats["index_mb"] = size_mb
+            result[f"{mode} {knob}={value}"] = stats
+    return result
+
+
+def bench_intent(args):
+    from travel_platforms import get_platform_suggestions
+
+    queries = INTENT_QUERIES * (args.queries * 10 // len(INTENT_QUERIES) + 1)
+    latencies, wall = timed_calls(get_platform_suggestions, [(q,) for q in queries])
+    stats = percentiles(latencies)
+    stats["qps"] = len(queries) / wall
+    return stats
+
+
+def bench_history(args, workdir):
+    """Cost of saving one more turn and of loading, as conversations grow"""
+    from history_store import HistoryStore
+
+    store = HistoryStore(workdir / "history")
+    results = []
+    for length in args.history_lengths:
+        conv_id = f"bench_{length}"
+        messages = [{"role": "user" if i % 2 == 0 else "assistant",
+                     "content": f"Message {i} about trains, hotels and beaches " * 4}
+                    for i in range(length)]
+        store.save(conv_id, "Bench", "now", messages, "bench")
+
+        save_latencies = []
+        for _ in range(args.history_repeats):
+            messages.append({"role": "user", "content": "One more question about Goa?"})
+            start = time.perf_counter()
+            store.save(conv_id, None, "now", messages, "bench")
+            save_latencies.append(time.perf_counter() - start)
+
+        load, _ = timed_calls(store.load, [(conv_id,)] * args.history_repeats)
+        tail, _ = timed_calls(store.load_tail, [(conv_id, 20)] * args.history_repeats)
+        store.close(conv_id)
+        results.append({"messages": length, "save_turn": percentiles(save_latencies),
+                        "load_all": percentiles(load), "load_tail_20": percentiles(tail)})
+    return results
+
+
+def bench_pipeline(args, workdir):
+    """End-to-end turns against the local LLM stub, retrieval included"""
+    import fake_groq_server
+    import knowledge_base as kb
+    from caching import SemanticCache
+    from chat_pipeline import start_turn
+    from travel_platforms import get_platform_suggestions
+
+    server = fake_groq_server.make_server(port=0, latency=args.llm_latency, token_delay=args.llm_token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Read when llm_gateway is first imported, on the first turn
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    corpus_dir = workdir / "pipeline"
+    corpus_dir.mkdir()
+    names = write_corpus(corpus_dir / "travel.csv", min(args.rows))
+    kb.INDEX_DIR = corpus_dir / "index"
+    knowledge_base = kb.KnowledgeBase(corpus_dir / "travel.csv", corpus_dir / "missing.pdf")
+    knowledge_base.get_db()
+    cache = SemanticCache(path=corpus_dir / "answers.sqlite3")
+
+    rng = random.Random(5)
+    ttft, total = [], []
+    for i in range(args.turns):
+        query = f"Plan a trip to {rng.choice(names)} #{i}" if i % 2 else f"{rng.choice(OPEN_QUERIES)} #{i}"
+        turn = start_turn(query, "llama-3.1-8b-instant", "gsk_bench", knowledge_base,
+                          get_platform_suggestions, cache)
+        for _ in turn.tokens():
+            pass
+        ttft.append(turn.timings.get("ttft", turn.timings["total"]))
+        total.append(turn.timings["total"])
+    server.shutdown()
+    return {"llm_latency": args.llm_latency, "llm_token_delay": args.llm_token_delay,
+            "first_token": percentiles(ttft), "total": percentiles(total)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(data, prefix=""):
+    """{"a.b.c": number} for every numeric leaf"""
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for value in data:
+            label = value.get("rows", value.get("messages")) if isinstance(value, dict) else None
+            items.update(flatten(value, f"{prefix}{label}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        items[prefix.rstrip(".")] = data
+    return items
+
+
+def compare(old, new, threshold):
+    """Print timings that moved by more than threshold between two runs"""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"\nChanges over {threshold:.0%} ({old['meta'].get('commit')} → {new['meta'].get('commit')}):")
+    for key in sorted(before.keys() & after.keys()):
+        if not (key.endswith(("_ms", "_seconds", "qps", "_mb")) or ".recall_at_" in key) or not before[key]:
+            continue
+        change = after[key] / before[key] - 1
+        if abs(change) > threshold:
+            print(f"  {key}: {before[key]:.3f} → {after[key]:.3f} ({change:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--queries", type=int, default=200, help="queries per rag_search setting")
+    parser.add_argument("--history-lengths", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--history-repeats", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=20, help="end-to-end turns against the LLM stub")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub seconds before the first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--index-rows", type=int, default=50000, help="vectors for the index recall report")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--embedding-model", help="override knowledge_base.EMBEDDING_MODEL")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["corpus", "index", "intent", "history", "pipeline"])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    import knowledge_base as kb
+
+    if args.embedding_model:
+        kb.EMBEDDING_MODEL = args.embedding_model
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="travel-bench-") as tmp:
+        workdir = Path(tmp)
+        if "corpus" not in args.skip:
+            results["corpora"] = []
+            for rows in args.rows:
+                print(f"📚 Corpus of {rows} rows")
+                results["corpora"].append(bench_corpus(rows, args, workdir))
+        if "index" not in args.skip:
+            print("🗜️ Index modes")
+            results["index"] = bench_index(args)
+        if "intent" not in args.skip:
+            print("🎯 Intent matching")
+            results["intent"] = bench_intent(args)
+        if "history" not in args.skip:
+            print("📝 History store")
+            results["history"] = bench_history(args, workdir)
+        if "pipeline" not in args.skip:
+            print("🤖 End-to-end turns")
+            results["pipeline"] = bench_pipeline(args, workdir)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedding_model": kb.EMBEDDING_MODEL,
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output} 💾")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
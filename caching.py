@@ -0,0 +1,198 @@
+"""In-process caches shared across Streamlit sessions"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+# Semantic answer cache settings
+SEMANTIC_CACHE_PATH = Path(os.environ.get("SEMANTIC_CACHE_PATH", "travel_guide_cache/answers.sqlite3"))
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "5000"))
+SEMANTIC_CACHE_TTL = float(os.environ.get("SEMANTIC_CACHE_TTL", "86400"))
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < time.monotonic():
+                del self._data[key]
+                item = None
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SemanticCache:
+    """Reuses an LLM answer when a close-enough query saw the same context,
+    model and prompt version. Queries answered without an embedding (place
+    index hits) only match the same normalized query. Entries are mirrored
+    to SQLite so they survive restarts."""
+
+    def __init__(self, path=SEMANTIC_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 maxsize=SEMANTIC_CACHE_SIZE, ttl=SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # bucket -> {row id: (unit vector, answer, created)}
+        self._buckets = {}
+        # row id -> bucket, in insertion (= age) order
+        self._bucket_of = {}
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bucket TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self._conn.execute("DELETE FROM answers WHERE created < ?", (time.time() - ttl,))
+        self._conn.commit()
+        for row_id, bucket, blob, answer, created in self._conn.execute(
+            "SELECT id, bucket, embedding, answer, created FROM answers ORDER BY id"
+        ):
+            vector = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self._buckets.setdefault(bucket, {})[row_id] = (vector, answer, created)
+            self._bucket_of[row_id] = bucket
+
+    @staticmethod
+    def _bucket(context, model, prompt_version, query=None):
+        key = f"{model}\0{prompt_version}\0{context}"
+        if query is not None:
+            # Exact-match entries get a bucket per normalized query
+            key += f"\0{normalize_query(query)}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding):
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, context, model, prompt_version, query=None):
+        """Cached answer for a similar query, or None.
+
+        With no embedding, only an earlier answer to the same query counts."""
+        unit = self._unit(embedding)
+        bucket = self._bucket(context, model, prompt_version, query if unit is None else None)
+        now = time.time()
+        with self._lock:
+            best_score, best_answer = self.threshold, None
+            for vector, answer, created in self._buckets.get(bucket, {}).values():
+                if now - created > self.ttl:
+                    continue
+                score = 1.0 if unit is None else float(np.dot(unit, vector))
+                if score >= best_score:
+                    best_score, best_answer = score, answer
+            if best_answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best_answer
+
+    def store(self, query, embedding, context, model, prompt_version, answer):
+        """Remember an answer, evicting the oldest entries beyond maxsize"""
+        vector = self._unit(embedding)
+        bucket = self._bucket(context, model, prompt_version, query if vector is None else None)
+        created = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (bucket, query, embedding, answer, created) VALUES (?, ?, ?, ?, ?)",
+                (bucket, query, b"" if vector is None else vector.tobytes(), answer, created),
+            )
+            self._buckets.setdefault(bucket, {})[cursor.lastrowid] = (vector, answer, created)
+            self._bucket_of[cursor.lastrowid] = bucket
+
+            expired = []
+            while len(self._bucket_of) > self.maxsize:
+                row_id = next(iter(self._bucket_of))
+                expired.append(row_id)
+                old_bucket = self._bucket_of.pop(row_id)
+                self._buckets[old_bucket].pop(row_id, None)
+                if not self._buckets[old_bucket]:
+                    del self._buckets[old_bucket]
+            if expired:
+                self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in expired])
+            self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._bucket_of),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Return the answer cache shared by every session in this process"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -0,0 +1,207 @@
+"""Async chat turn: retrieval and platform matching overlap, then the LLM streams"""
+import asyncio
+import contextlib
+import os
+import queue
+import random
+import threading
+import time
+
+from metrics import PROFILE_SAMPLE_RATE, TOKEN_BUCKETS, SamplingProfiler, get_metrics
+from prompt_builder import PROMPT_CHUNKS, PROMPT_VERSION, build_prompt, count_tokens
+
+# Per-stage timeouts in seconds; a stage that runs over is skipped, not fatal
+RETRIEVAL_TIMEOUT = float(os.environ.get("RETRIEVAL_TIMEOUT", "3"))
+PLATFORM_TIMEOUT = float(os.environ.get("PLATFORM_TIMEOUT", "0.5"))
+LLM_FIRST_TOKEN_TIMEOUT = float(os.environ.get("LLM_FIRST_TOKEN_TIMEOUT", "20"))
+LLM_TOTAL_TIMEOUT = float(os.environ.get("LLM_TOTAL_TIMEOUT", "90"))
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Background event loop shared by every session in this process"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="chat-pipeline", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+class ChatTurn:
+    """One user message being answered on the background loop"""
+
+    def __init__(self, model=None, consumer_loop=None):
+        self.model = model
+        self.platforms = {}
+        self.timings = {}
+        self.profile_path = None
+        # Async consumers (the API server) get events on their own loop instead
+        self._consumer_loop = consumer_loop
+        self._events = asyncio.Queue() if consumer_loop is not None else queue.Queue()
+        self._future = None
+
+    def _put(self, event):
+        if self._consumer_loop is None:
+            self._events.put(event)
+        elif not self._consumer_loop.is_closed():
+            self._consumer_loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+    def _emit(self, text):
+        self._put(("token", text))
+
+    def _finish(self):
+        self._put(("done", None))
+
+    def tokens(self):
+        """Yield answer text as it arrives; abandoning the generator cancels the turn"""
+        try:
+            while True:
+                kind, text = self._events.get()
+                if kind == "done":
+                    return
+                yield text
+        finally:
+            self.cancel()
+
+    async def atokens(self):
+        """tokens() for a turn started with consumer_loop, awaited on that loop"""
+        try:
+            while True:
+                kind, text = await self._events.get()
+                if kind == "done":
+                    return
+                yield text
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        """Stop the turn if it is still running"""
+        if self._future is not None and not self._future.done():
+            self._future.cancel()
+
+
+async def _stream_llm(turn, prompt, model, api_key, start, meta, max_tokens=900):
+    """Stream the Groq answer into the turn and return the full text"""
+    # groq/httpx load here (or during warm-up), not when the page first renders
+    from llm_gateway import get_gateway
+
+    parts = []
+    loop = asyncio.get_running_loop()
+    try:
+        async with asyncio.timeout(LLM_FIRST_TOKEN_TIMEOUT) as deadline:
+            async for delta in get_gateway().stream_chat(
+                api_key,
+                model,
+                [{"role": "user", "content": prompt}],
+                meta=meta,
+                temperature=0.4,
+                max_tokens=max_tokens
+            ):
+                if not parts:
+                    turn.timings["ttft"] = time.perf_counter() - start
+                    deadline.reschedule(loop.time() + LLM_TOTAL_TIMEOUT)
+                parts.append(delta)
+                turn._emit(delta)
+    except TimeoutError:
+        turn._emit(("\n\n" if parts else "") + "⚠️ The travel assistant is taking too long, please try again.")
+        return None
+    except Exception as e:
+        turn._emit(("\n\n" if parts else "") + f"⚠️ Error: {str(e)}")
+        return None
+    return "".join(parts)
+
+
+def _timed_call(stage, profiler, fn, *args):
+    with get_metrics().timer(stage), (profiler.watch() if profiler else contextlib.nullcontext()):
+        return fn(*args)
+
+
+async def _run_turn(turn, user_query, model, api_key, knowledge_base, match_platforms, semantic_cache,
+                    history=(), profile=False):
+    metrics = get_metrics()
+    profiler = None
+    if profile or random.random() < PROFILE_SAMPLE_RATE:
+        # The loop thread plus the worker threads running this turn's stages
+        profiler = SamplingProfiler(threads=[threading.get_ident()]).start()
+    start = time.perf_counter()
+    retrieval = asyncio.ensure_future(asyncio.wait_for(
+        asyncio.to_thread(_timed_call, "retrieve", profiler, knowledge_base.retrieve, user_query,
+                          PROMPT_CHUNKS),
+        RETRIEVAL_TIMEOUT
+    ))
+    platforms = asyncio.ensure_future(asyncio.wait_for(
+        asyncio.to_thread(_timed_call, "platforms", profiler, match_platforms, user_query), PLATFORM_TIMEOUT
+    ))
+    try:
+        # 🔥 RAG SEARCH (CSV + PDF); answer without context if it is slow or fails
+        try:
+            query_embedding, chunks = await retrieval
+        except Exception as e:
+            print("Retrieval skipped ❌ :", repr(e))
+            metrics.inc("travel_events_total", event="retrieval_skipped")
+            query_embedding, chunks = None, []
+        turn.timings["retrieval"] = time.perf_counter() - start
+
+        # 📐 Fit the data and earlier turns into the model's token budget
+        with metrics.timer("build_prompt"):
+            prompt = build_prompt(user_query, chunks, history, model)
+
+        # ♻️ Reuse the answer to a near-identical earlier question
+        answer = semantic_cache.lookup(query_embedding, prompt.cache_key, model, PROMPT_VERSION, user_query)
+        if answer is not None:
+            turn.timings["ttft"] = time.perf_counter() - start
+            metrics.inc("travel_events_total", event="answer_cache_hit")
+            turn._emit(answer)
+        else:
+            meta = {}
+            answer = await _stream_llm(turn, prompt.text, model, api_key, start, meta, prompt.max_tokens)
+            turn.model = meta.get("model", model)
+            llm_seconds = time.perf_counter() - start
+            metrics.observe("travel_llm_prompt_tokens", prompt.tokens, TOKEN_BUCKETS, model=turn.model)
+            if "ttft" in turn.timings:
+                metrics.observe("travel_llm_first_token_seconds", turn.timings["ttft"], model=turn.model)
+            if answer:
+                metrics.observe("travel_llm_seconds", llm_seconds, model=turn.model)
+                metrics.observe("travel_llm_completion_tokens", count_tokens(answer, turn.model),
+                                TOKEN_BUCKETS, model=turn.model)
+                # Filed under the model that answered, which may be the fallback; the SQLite
+                # write runs off the loop so other sessions' tokens keep streaming
+                await asyncio.to_thread(semantic_cache.store, user_query, query_embedding, prompt.cache_key,
+                                        turn.model, PROMPT_VERSION, answer)
+            else:
+                metrics.inc("travel_events_total", event="llm_error", model=turn.model)
+
+        try:
+            turn.platforms = await platforms
+        except Exception as e:
+            print("Platform matching skipped ❌ :", repr(e))
+    finally:
+        retrieval.cancel()
+        platforms.cancel()
+        turn.timings["total"] = time.perf_counter() - start
+        metrics.observe("travel_stage_seconds", turn.timings["total"], stage="turn")
+        if profiler is not None:
+            turn.profile_path = profiler.stop(f"turn-{int(time.time() * 1000)}")
+
+
+def start_turn(user_query, model, api_key, knowledge_base, match_platforms, semantic_cache, history=(),
+               profile=False, consumer_loop=None):
+    """Schedule a turn on the background loop and return its handle.
+
+    history: the messages before user_query, summarized into the prompt.
+    profile: sample this turn's stacks into PROFILE_DIR.
+    consumer_loop: event loop that will read the turn with atokens()."""
+    turn = ChatTurn(model, consumer_loop)
+    turn._future = asyncio.run_coroutine_threadsafe(
+        _run_turn(turn, user_query, model, api_key, knowledge_base, match_platforms, semantic_cache,
+                  list(history), profile),
+        get_event_loop(),
+    )
+    # Also fires if the turn is cancelled before it starts running
+    turn._future.add_done_callback(lambda _: turn._finish())
+    return turn
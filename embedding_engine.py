@@ -0,0 +1,237 @@
+"""Batched, multi-core sentence-transformer embeddings for index builds and queries"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import get_metrics
+
+# Padded tokens per forward pass; short docs get big batches, long docs small ones
+TOKENS_PER_BATCH = int(os.environ.get("EMBED_TOKENS_PER_BATCH", "16384"))
+MAX_BATCH_SIZE = int(os.environ.get("EMBED_MAX_BATCH_SIZE", "256"))
+# Process pool size for bulk builds (1 disables the pool)
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", str(os.cpu_count() or 1)))
+# Below this many documents the pool start-up costs more than it saves
+MIN_POOL_DOCUMENTS = int(os.environ.get("EMBED_MIN_POOL_DOCUMENTS", "2000"))
+# Concurrent queries are encoded together: at most this many per forward pass (1 disables)
+QUERY_BATCH_SIZE = int(os.environ.get("EMBED_QUERY_BATCH_SIZE", "32"))
+# How long the first query of a batch waits for others to join it
+QUERY_BATCH_WAIT_MS = float(os.environ.get("EMBED_QUERY_BATCH_WAIT_MS", "3"))
+QUERY_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    """Load the model once in each pool process"""
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_in_worker(texts):
+    return _worker_model.encode(
+        texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+    )
+
+
+class QueryBatcher:
+    """Coalesces concurrent single-query encodes into one batched forward pass.
+
+    Callers get a Future; one background thread takes the first waiting
+    query, gathers whatever else arrives within max_wait_ms (up to
+    max_batch_size) and encodes them together. The wait only applies once
+    queries are actually overlapping, so a lone session pays nothing."""
+
+    def __init__(self, encode, max_batch_size=QUERY_BATCH_SIZE, max_wait_ms=QUERY_BATCH_WAIT_MS):
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._last_batch_size = 1
+        self._thread = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """Queue a text for encoding; the Future resolves to its vector"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        wait = self.max_wait if self._last_batch_size > 1 else 0.0
+        deadline = time.monotonic() + wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Take what is already queued, then wait out the rest of the window
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(text, future) for text, future in self._collect()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self._last_batch_size = len(batch)
+            get_metrics().observe("travel_query_batch_size", len(batch), buckets=QUERY_BATCH_BUCKETS)
+            try:
+                vectors = self._encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector.tolist())
+
+
+class BatchEmbeddings(Embeddings):
+    """Length-bucketed batches, spread over a process pool for large builds.
+
+    The pool starts on the first large call and is reused by later ones, so
+    its workers load the model once per build rather than once per batch;
+    close_pool() releases them when the build is done."""
+
+    def __init__(self, model_name, workers=EMBED_WORKERS,
+                 tokens_per_batch=TOKENS_PER_BATCH, max_batch_size=MAX_BATCH_SIZE,
+                 min_pool_documents=MIN_POOL_DOCUMENTS):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.workers = max(1, workers)
+        self.tokens_per_batch = tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.min_pool_documents = min_pool_documents
+        self.last_docs_per_second = None
+        self.query_batch_size = QUERY_BATCH_SIZE
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def start_pool(self):
+        """Start the worker pool (once); None when workers is 1"""
+        if self._pool is None and self.workers > 1:
+            with self._pool_lock:
+                if self._pool is None:
+                    threads = max(1, (os.cpu_count() or 1) // self.workers)
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.model_name, threads),
+                    )
+        return self._pool
+
+    def close_pool(self):
+        """Shut the worker pool down, freeing each worker's copy of the model"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _token_lengths(self, texts):
+        """Token count of each text, capped at the model's sequence length"""
+        encoded = self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _make_batches(self, texts):
+        """Group text indices of similar length under the padded-token budget"""
+        lengths = self._token_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+        batches = []
+        batch = []
+        for i in order:
+            # Sorted ascending, so lengths[i] is the padded length of the batch
+            if batch and (
+                len(batch) >= self.max_batch_size
+                or (len(batch) + 1) * lengths[i] > self.tokens_per_batch
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def embed_documents(self, texts):
+        """Embed documents, returning vectors in input order"""
+        if not texts:
+            return []
+
+        texts = [text.replace("\n", " ") for text in texts]
+        start = time.perf_counter()
+        batches = self._make_batches(texts)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        pool = self._pool
+        if pool is None and len(texts) >= self.min_pool_documents:
+            pool = self.start_pool()
+        if pool is not None:
+            results = list(pool.map(_encode_in_worker, batch_texts))
+        else:
+            results = [
+                self.model.encode(
+                    chunk, batch_size=len(chunk), convert_to_numpy=True, show_progress_bar=False
+                )
+                for chunk in batch_texts
+            ]
+
+        vectors = [None] * len(texts)
+        for batch, embedded in zip(batches, results):
+            for i, vector in zip(batch, embedded):
+                vectors[i] = vector.tolist()
+
+        elapsed = time.perf_counter() - start
+        get_metrics().observe("travel_stage_seconds", elapsed, stage="embed_documents")
+        self.last_docs_per_second = len(texts) / elapsed if elapsed > 0 else None
+        print(f"Embedded {len(texts)} docs in {elapsed:.1f}s "
+              f"({self.last_docs_per_second or 0:.0f} docs/s, {len(batches)} batches) ⚡")
+        return vectors
+
+    def _encode_queries(self, texts):
+        return self.model.encode(
+            texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+        )
+
+    @property
+    def batcher(self):
+        """The query batcher, started on first use"""
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = QueryBatcher(self._encode_queries, self.query_batch_size)
+        return self._batcher
+
+    def embed_query(self, text):
+        """Embed a single query, batched with any queries other sessions send meanwhile"""
+        text = text.replace("\n", " ")
+        if self.query_batch_size <= 1:
+            return self.model.encode(text, convert_to_numpy=True, show_progress_bar=False).tolist()
+        return self.batcher.submit(text).result()
@@ -0,0 +1,120 @@
+"""Local stand-in for the Groq chat completions API.
+
+Run it, then point the app at it:
+
+    python fake_groq_server.py --port 8765 --latency 0.3 --rate-limit 0.2
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run travel_guide_chatbot.py
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ("Goa is famous for its beaches, nightlife and old churches. "
+         "Book hotels early in peak season and try the local seafood! 🌴")
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None
+
+    def log_message(self, format, *args):
+        if not self.options.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        roll = random.random()
+        if roll < self.options.rate_limit:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                            {"retry-after": "0.1"})
+            return
+        if roll < self.options.rate_limit + self.options.server_error:
+            self._send_json(503, {"error": {"message": "Service unavailable"}})
+            return
+
+        time.sleep(self.options.latency)
+        model = request.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        words = [word + " " for word in self.options.reply.split(" ")]
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(words).strip()}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": word} if i == 0
+                             else {"content": word}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            time.sleep(self.options.token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+def make_server(host="127.0.0.1", port=8765, latency=0.0, token_delay=0.0,
+                rate_limit=0.0, server_error=0.0, reply=REPLY, quiet=True):
+    """Build (but don't start) a fake server; handy for benchmarks"""
+    options = argparse.Namespace(latency=latency, token_delay=token_delay, rate_limit=rate_limit,
+                                 server_error=server_error, reply=reply, quiet=quiet)
+    handler = type("Handler", (FakeGroqHandler,), {"options": options})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between tokens")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--server-error", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--reply", default=REPLY)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.token_delay,
+                         args.rate_limit, args.server_error, args.reply, quiet=False)
+    print(f"Fake Groq API on http://{args.host}:{args.port} 🧪")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Chat history: an append-only log per conversation plus a SQLite index for the sidebar"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
+from pathlib import Path
+
+HISTORY_DIR = Path("travel_guide_history")
+INDEX_NAME = "index.sqlite3"
+# fsync a conversation log after this many appended messages (and always on close)
+FSYNC_EVERY = int(os.environ.get("HISTORY_FSYNC_EVERY", "8"))
+# Conversation logs kept open for appending; the least recently saved is closed past this
+HISTORY_OPEN_LOGS = int(os.environ.get("HISTORY_OPEN_LOGS", "64"))
+# Bytes read per step when scanning a log backwards for its last messages
+TAIL_BLOCK = 1 << 16
+
+
+class _ConversationLog:
+    """Open append handle for one conversation_<id>.jsonl"""
+
+    def __init__(self, path, count, size):
+        self.file = open(path, 'a', encoding='utf-8')
+        self.count = count
+        # File size after our last write, to tell our own appends from anyone else's
+        self.bytes = size
+        self.unsynced = 0
+
+
+class HistoryStore:
+    """JSONL conversation logs with an indexed table of id, title, timestamp and count.
+
+    Each save appends only the messages not yet on disk, one JSON line per
+    message, so a turn costs the same however long the chat is. The index
+    row also records the log's size in bytes: while the file still has that
+    size, its message count is taken from the row rather than by reading
+    the file, so reopening a log (as every API worker does) stays cheap.
+    Closing a conversation fsyncs it and compacts away any torn trailing line.
+    At most max_open_logs handles stay open; sessions that end without
+    closing their conversation have theirs closed as others are saved."""
+
+    def __init__(self, history_dir=HISTORY_DIR, max_open_logs=HISTORY_OPEN_LOGS):
+        self.history_dir = Path(history_dir)
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.max_open_logs = max_open_logs
+        # conv id -> _ConversationLog, least recently used first
+        self._logs = OrderedDict()
+        self._conn = sqlite3.connect(str(self.history_dir / INDEX_NAME), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                messages_count INTEGER NOT NULL,
+                model TEXT,
+                log_bytes INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(conversations)")}
+        if "log_bytes" not in columns:
+            self._conn.execute("ALTER TABLE conversations ADD COLUMN log_bytes INTEGER")
+            self._conn.commit()
+        self._migrate_json_files()
+        atexit.register(self.close_all)
+
+    def _legacy_path(self, conv_id):
+        return self.history_dir / f"conversation_{conv_id}.json"
+
+    def _log_path(self, conv_id):
+        return self.history_dir / f"conversation_{conv_id}.jsonl"
+
+    def _migrate_json_files(self):
+        """One-time import of conversations saved before the index existed"""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done:
+                return
+
+            rows = []
+            for file in self.history_dir.glob("conversation_*.json"):
+                try:
+                    with open(file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                rows.append((
+                    file.stem.replace("conversation_", ""),
+                    data.get("title", "Untitled"),
+                    data.get("timestamp", ""),
+                    len(data.get("messages", [])),
+                    data.get("model"),
+                ))
+
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO conversations (id, title, timestamp, messages_count, model) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+            self._conn.commit()
+            if rows:
+                print(f"Indexed {len(rows)} saved conversations 📚")
+
+    def list_conversations(self, limit=20):
+        """Newest conversations first, without opening any conversation file"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, timestamp, messages_count FROM conversations "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return {
+            conv_id: {"title": title, "timestamp": timestamp, "messages_count": count}
+            for conv_id, title, timestamp, count in rows
+        }
+
+    def iter_messages(self, conv_id):
+        """Stream a conversation's messages from disk; a torn last line is skipped"""
+        log_path = self._log_path(conv_id)
+        if log_path.exists():
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            return
+
+        # Conversations saved before the append-only log
+        legacy_path = self._legacy_path(conv_id)
+        if legacy_path.exists():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                yield from json.load(f).get("messages", [])
+
+    def _rewrite(self, conv_id, messages):
+        """Atomically replace a conversation log with exactly these messages"""
+        log_path = self._log_path(conv_id)
+        tmp_path = log_path.with_name(log_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for message in messages:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, log_path)
+        self._legacy_path(conv_id).unlink(missing_ok=True)
+
+    def _indexed_count(self, conv_id, log_path):
+        """Message count from the index row, None unless the log is exactly as that row left it"""
+        row = self._conn.execute(
+            "SELECT messages_count, log_bytes FROM conversations WHERE id = ?", (conv_id,)
+        ).fetchone()
+        try:
+            size = log_path.stat().st_size
+        except OSError:
+            return None
+        if row is None or row[1] != size:
+            return None
+        return row[0]
+
+    def _count_messages(self, conv_id, log_path):
+        """Read a log through to count its messages, repairing a torn tail first"""
+        if log_path.exists():
+            torn = False
+            with open(log_path, 'rb') as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            if torn:
+                self._rewrite(conv_id, list(self.iter_messages(conv_id)))
+            with open(log_path, 'rb') as f:
+                return sum(1 for _ in f)
+        if self._legacy_path(conv_id).exists():
+            # Convert an old JSON conversation the first time it grows
+            messages = list(self.iter_messages(conv_id))
+            self._rewrite(conv_id, messages)
+            return len(messages)
+        return 0
+
+    def _open_log(self, conv_id):
+        """Append handle for a conversation, counting its messages from the index when possible"""
+        log = self._logs.get(conv_id)
+        if log is not None:
+            self._logs.move_to_end(conv_id)
+            return log
+
+        log_path = self._log_path(conv_id)
+        count = self._indexed_count(conv_id, log_path)
+        if count is None:
+            count = self._count_messages(conv_id, log_path)
+        size = log_path.stat().st_size if log_path.exists() else 0
+        log = self._logs[conv_id] = _ConversationLog(log_path, count, size)
+        while len(self._logs) > self.max_open_logs:
+            self._close_log(*self._logs.popitem(last=False))
+        return log
+
+    def save(self, conv_id, title, timestamp, messages, model, offset=0, replace=False):
+        """Append the messages not yet on disk and update the index row.
+
+        messages holds the conversation from position offset onwards; a
+        title of None keeps the one already indexed. replace=True means the
+        transcript was cleared or swapped, so the log from offset on is
+        rewritten with messages rather than appended to."""
+        with self._lock:
+            log = self._open_log(conv_id)
+            total = offset + len(messages)
+            if replace or total < log.count:
+                # The transcript was cleared or replaced; start the log over
+                log.file.close()
+                kept = list(islice(self.iter_messages(conv_id), offset))
+                self._rewrite(conv_id, kept + list(messages))
+                log_path = self._log_path(conv_id)
+                log = self._logs[conv_id] = _ConversationLog(log_path, total, log_path.stat().st_size)
+            elif total > log.count:
+                new_lines = "".join(
+                    json.dumps(message, ensure_ascii=False) + "\n"
+                    for message in messages[log.count - offset:]
+                )
+                # One write per save, so a crash tears at most the last line
+                log.file.write(new_lines)
+                log.file.flush()
+                log.bytes += len(new_lines.encode("utf-8"))
+                log.unsynced += total - log.count
+                log.count = total
+                if log.unsynced >= FSYNC_EVERY:
+                    os.fsync(log.file.fileno())
+                    log.unsynced = 0
+
+            self._conn.execute(
+                "INSERT INTO conversations (id, title, timestamp, messages_count, model, log_bytes) "
+                "VALUES (?, COALESCE(?, 'Travel Chat'), ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = COALESCE(?, title), "
+                "timestamp = excluded.timestamp, messages_count = excluded.messages_count, "
+                "model = excluded.model, log_bytes = excluded.log_bytes",
+                (conv_id, title, timestamp, log.count, model, log.bytes, title),
+            )
+            self._conn.commit()
+        return self._log_path(conv_id)
+
+    def load(self, conv_id):
+        """Saved messages for a conversation, None if it cannot be read"""
+        try:
+            if not (self._log_path(conv_id).exists() or self._legacy_path(conv_id).exists()):
+                return None
+            return list(self.iter_messages(conv_id))
+        except (OSError, ValueError):
+            return None
+
+    def _read_tail(self, log_path, count):
+        """Last `count` messages of a log, read backwards from its end"""
+        with open(log_path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            data = b""
+            # count + 1 newlines: the file's final one plus one before each kept line
+            while position > 0 and data.count(b"\n") <= count:
+                step = min(TAIL_BLOCK, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = data.splitlines()[-count:] if count else []
+        return [json.loads(line) for line in lines]
+
+    def load_tail(self, conv_id, count):
+        """(offset, last `count` messages) without holding the whole conversation"""
+        try:
+            log_path = self._log_path(conv_id)
+            with self._lock:
+                log = self._logs.get(conv_id)
+                total = log.count if log is not None else self._indexed_count(conv_id, log_path)
+            if total is not None:
+                tail = self._read_tail(log_path, count)
+                return total - len(tail), tail
+            if not (log_path.exists() or self._legacy_path(conv_id).exists()):
+                return None
+            total = 0
+            tail = deque(maxlen=count)
+            for message in self.iter_messages(conv_id):
+                tail.append(message)
+                total += 1
+            return total - len(tail), list(tail)
+        except (OSError, ValueError):
+            return None
+
+    def read_messages(self, conv_id, start, stop):
+        """Messages start..stop-1 of a conversation, streamed from disk"""
+        return list(islice(self.iter_messages(conv_id), start, stop))
+
+    def _close_log(self, conv_id, log):
+        log.file.flush()
+        os.fsync(log.file.fileno())
+        size = os.fstat(log.file.fileno()).st_size
+        log.file.close()
+
+        # Only a log something else wrote to needs reading back and compacting
+        if size != log.bytes:
+            self._rewrite(conv_id, list(self.iter_messages(conv_id)))
+
+    def close(self, conv_id):
+        """fsync and close a conversation log, compacting it if needed"""
+        with self._lock:
+            log = self._logs.pop(conv_id, None)
+            if log is not None:
+                self._close_log(conv_id, log)
+
+    def close_all(self):
+        for conv_id in list(self._logs):
+            self.close(conv_id)
+
+    def delete(self, conv_id):
+        """Remove a conversation log and its index row"""
+        with self._lock:
+            log = self._logs.pop(conv_id, None)
+            if log is not None:
+                log.file.close()
+            self._log_path(conv_id).unlink(missing_ok=True)
+            self._legacy_path(conv_id).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
+            self._conn.commit()
+
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the history store shared by every session in this process"""
+    global _history_store
+    if _history_store is None:
+        with _history_store_lock:
+            if _history_store is None:
+                _history_store = HistoryStore()
+    return _history_store
@@ -0,0 +1,68 @@
+"""Single-pass keyword intent matcher for booking platform categories"""
+import re
+
+# \w misses Devanagari vowel signs, so that block is listed explicitly
+WORD_RE = re.compile(r"[\wऀ-ॿ]+")
+
+_END = object()
+
+
+def stem(word):
+    """Light English suffix stripping: hotels → hotel, buses → bus, booking → book"""
+    if len(word) <= 3 or not word.isascii():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            # planned → plann → plan
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouls":
+                word = word[:-1]
+            return word
+    if word.endswith(("ses", "xes", "ches", "shes", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, stemmed word tokens"""
+    return [stem(token) for token in WORD_RE.findall(text.lower())]
+
+
+class IntentMatcher:
+    """Matches whole words and phrases from a {category: [keywords]} table.
+
+    Keywords are stemmed into a token trie once, so a query is scanned in a
+    single pass whose cost depends on the query length, not the table size."""
+
+    def __init__(self, keyword_table):
+        self.categories = list(keyword_table)
+        self._rank = {category: i for i, category in enumerate(self.categories)}
+        self._trie = {}
+        self._max_phrase = 1
+        for category, keywords in keyword_table.items():
+            for keyword in keywords:
+                tokens = tokenize(keyword)
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, set()).add(category)
+                self._max_phrase = max(self._max_phrase, len(tokens))
+
+    def match(self, text):
+        """Categories mentioned in text, in keyword-table order"""
+        tokens = tokenize(text)
+        found = set()
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:start + self._max_phrase]:
+                node = node.get(token)
+                if node is None:
+                    break
+                found.update(node.get(_END, ()))
+        return sorted(found, key=self._rank.__getitem__)
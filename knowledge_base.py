@@ -0,0 +1,407 @@
+"""Process-wide travel knowledge base (travel.csv + travel.pdf → FAISS)"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from pathlib import Path
+
+# LangChain, FAISS and sentence-transformers are imported where first used,
+# so importing this module stays cheap and the app shell paints at once
+from caching import TTLCache, normalize_query
+from metrics import get_metrics
+from pdf_chunker import CHUNK_OVERLAP, CHUNK_TOKENS, iter_pdf_chunks
+from place_index import PlaceIndex
+from retrieval import BM25Index, hybrid_search, load_reranker
+from vector_index import INDEX_MODE, build_settings, compact_index, configure_search, delete_documents, flat_index, index_kind
+
+EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+# Saved indexes live in INDEX_DIR/<hash of sources + model>/
+INDEX_DIR = Path(os.environ.get("TRAVEL_INDEX_DIR", "faiss_index"))
+MANIFEST_NAME = "manifest.json"
+BM25_NAME = "bm25.pkl"
+
+# Documents embedded and added to the index per step while ingesting
+INGEST_BATCH = int(os.environ.get("INGEST_BATCH", "512"))
+
+# rag_search results per normalized query, dropped whenever the index changes
+SEARCH_CACHE_SIZE = int(os.environ.get("RAG_CACHE_SIZE", "2048"))
+SEARCH_CACHE_TTL = float(os.environ.get("RAG_CACHE_TTL", "3600"))
+
+
+def load_documents(csv_path="travel.csv", pdf_path="travel.pdf"):
+    """Yield CSV rows and heading-aware PDF chunks as documents"""
+    count = 0
+
+    # Load CSV safely
+    try:
+        from langchain_community.document_loaders import CSVLoader
+
+        csv_loader = CSVLoader(file_path=str(csv_path))
+        for doc in csv_loader.lazy_load():
+            count += 1
+            yield doc
+        print("CSV loaded ✅")
+    except Exception as e:
+        print("CSV error:", e)
+
+    # Load PDF safely (IMPORTANT)
+    try:
+        chunks = 0
+        for doc in iter_pdf_chunks(pdf_path):
+            chunks += 1
+            yield doc
+        count += chunks
+        print(f"PDF loaded ✅ ({chunks} chunks)")
+    except Exception as e:
+        print("PDF skipped ❌ :", e)
+
+    print(f"Total documents loaded: {count}")
+
+
+def document_id(doc):
+    """Stable fingerprint of a CSV row / PDF page: its source and text"""
+    source = str(doc.metadata.get("source", ""))
+    key = f"{source}\n{doc.page_content}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
+
+
+def is_own_index(folder):
+    """Whether a folder holds a saved index written by this module"""
+    manifest = read_manifest(folder)
+    return (manifest is not None and "model" in manifest
+            and manifest.get("sources_hash", folder.name) == folder.name)
+
+
+def is_abandoned_build(folder):
+    """A <hash>.tmp-<pid> folder whose building process is gone (it crashed mid-save)"""
+    name, _, pid = folder.name.partition(".tmp-")
+    return (folder.is_dir() and pid.isdigit() and len(name) == 16
+            and all(c in "0123456789abcdef" for c in name) and not _process_alive(int(pid)))
+
+
+def manifest_settings(manifest):
+    """build_settings() of a saved index; older manifests only recorded the kind"""
+    return manifest.get("settings") or ("flat" if manifest.get("index", "flat") == "flat" else None)
+
+
+def read_manifest(folder):
+    """Manifest of what a saved index holds, None if absent or unreadable"""
+    try:
+        with open(Path(folder) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class KnowledgeBase:
+    """Embeds the travel sources once and rebuilds only when they change on disk"""
+
+    def __init__(self, csv_path="travel.csv", pdf_path="travel.pdf"):
+        self.csv_path = Path(csv_path)
+        self.pdf_path = Path(pdf_path)
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._db = None
+        self._bm25 = None
+        self._places = PlaceIndex([])
+        self._reranker = None
+        self._signature = None
+        self.search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+    def _source_signature(self):
+        """(mtime, size) of each source file, None when it is missing"""
+        signature = []
+        for path in (self.csv_path, self.pdf_path):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @property
+    def embeddings(self):
+        """Sentence-transformer model, loaded once per process"""
+        if self._embeddings is None:
+            from embedding_engine import BatchEmbeddings
+
+            self._embeddings = BatchEmbeddings(EMBEDDING_MODEL)
+        return self._embeddings
+
+    @property
+    def reranker(self):
+        """Candidate reranker, loaded once per process"""
+        if self._reranker is None:
+            self._reranker = load_reranker()
+        return self._reranker
+
+    def _content_hash(self):
+        """Hash of the source file contents, embedding model, chunk and index settings"""
+        digest = hashlib.sha256(
+            f"{EMBEDDING_MODEL}\0{CHUNK_TOKENS}\0{CHUNK_OVERLAP}\0{build_settings()}".encode("utf-8")
+        )
+        for path in (self.csv_path, self.pdf_path):
+            digest.update(path.name.encode("utf-8"))
+            try:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+            except OSError:
+                digest.update(b"<missing>")
+        return digest.hexdigest()[:16]
+
+    def _load_index(self, folder, mmap=True):
+        """Load a saved index, memory-mapped where FAISS supports it"""
+        import faiss
+        from langchain_community.vectorstores import FAISS
+
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        mmap_flags = mmap_flag | faiss.IO_FLAG_READ_ONLY
+        for io_flags in ((mmap_flags, 0) if mmap else (0,)):
+            try:
+                return FAISS.load_local(
+                    str(folder),
+                    self.embeddings,
+                    allow_dangerous_deserialization=True,
+                    io_flags=io_flags,
+                )
+            except RuntimeError as e:
+                if io_flags == 0:
+                    raise
+                print("mmap load failed, reading index into memory:", e)
+
+    def _load_bm25(self, folder, db):
+        """Saved keyword index, rebuilt from the docstore if missing"""
+        try:
+            with open(folder / BM25_NAME, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return BM25Index((doc_id, doc.page_content) for doc_id, doc in db.docstore._dict.items())
+
+    def _save_index(self, db, folder, manifest, bm25):
+        """Write the index next to its final folder, then rename it into place"""
+        INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_folder = folder.with_name(f"{folder.name}.tmp-{os.getpid()}")
+        db.save_local(str(tmp_folder))
+        with open(tmp_folder / BM25_NAME, "wb") as f:
+            pickle.dump(bm25, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(tmp_folder / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        try:
+            os.replace(tmp_folder, folder)
+        except OSError:
+            # Another worker saved the same index first
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            return
+
+        # INDEX_DIR may be shared: only remove what this module wrote
+        for old in INDEX_DIR.iterdir():
+            if old != folder and (is_own_index(old) or is_abandoned_build(old)):
+                shutil.rmtree(old, ignore_errors=True)
+
+    def _latest_index(self):
+        """Most recently saved index built with the current embedding model.
+
+        One built with the current index settings is preferred, then a flat
+        one (compacted after the update); any other compact index is decoded
+        back to a flat one and recompacted, which still needs no embedding."""
+        latest = None
+        settings = build_settings()
+        if INDEX_DIR.exists():
+            for folder in INDEX_DIR.iterdir():
+                if ".tmp-" in folder.name:
+                    continue
+                manifest = read_manifest(folder)
+                if not manifest or manifest.get("model") != EMBEDDING_MODEL:
+                    continue
+                built = manifest_settings(manifest)
+                rank = (built == settings, built == "flat", folder.stat().st_mtime)
+                if latest is None or rank > latest[0]:
+                    latest = (rank, folder, manifest)
+        return latest[1:] if latest else (None, None)
+
+    def _ingest(self, folder):
+        """Bring the newest saved index up to date, embedding only changed docs.
+
+        Documents stream in from the loaders and are embedded INGEST_BATCH at
+        a time, so the PDF is never held in memory whole. Once enough documents
+        need embedding to be worth it, the embedding process pool starts and
+        batches grow to INGEST_BATCH per worker; it is shut down afterwards.
+        With a compact INDEX_MODE the quantizers are trained here, once the
+        corpus is in."""
+        db = None
+        indexed = {}
+        previous, manifest = self._latest_index()
+        if previous is not None:
+            try:
+                db = self._load_index(previous, mmap=False)
+                indexed = manifest.get("documents", {})
+            except Exception as e:
+                print("Previous index unreadable, embedding everything:", e)
+            else:
+                if manifest_settings(manifest) not in ("flat", build_settings()):
+                    # Built with other settings: recompact it once the update is in
+                    db.index = flat_index(db.index)
+
+        documents = {}
+        bm25 = BM25Index()
+        batch, batch_ids = [], []
+        fresh = 0
+        embeddings = self.embeddings
+        batch_size = INGEST_BATCH
+
+        def add_batch(db):
+            if db is None:
+                from langchain_community.vectorstores import FAISS
+
+                db = FAISS.from_documents(batch, self.embeddings, ids=batch_ids)
+            else:
+                db.add_documents(batch, ids=batch_ids)
+            batch.clear()
+            batch_ids.clear()
+            return db
+
+        try:
+            for doc in load_documents(self.csv_path, self.pdf_path):
+                doc_id = document_id(doc)
+                if doc_id in documents:
+                    continue
+                documents[doc_id] = {
+                    key: doc.metadata.get(key) for key in ("source", "row", "page", "section")
+                }
+                bm25.add(doc_id, doc.page_content)
+                if doc_id not in indexed:
+                    batch.append(doc)
+                    batch_ids.append(doc_id)
+                    fresh += 1
+                    if fresh == embeddings.min_pool_documents and embeddings.start_pool() is not None:
+                        batch_size = INGEST_BATCH * embeddings.workers
+                    if len(batch) >= batch_size:
+                        db = add_batch(db)
+            if batch or db is None:
+                db = add_batch(db)
+        finally:
+            embeddings.close_pool()
+
+        stale = [doc_id for doc_id in indexed if doc_id not in documents]
+        if stale:
+            delete_documents(db, stale)
+        if index_kind(db.index) == "flat":
+            db.index = compact_index(db.index)
+        print(f"Index refreshed: {fresh} embedded, {len(stale)} removed, "
+              f"{len(documents) - fresh} unchanged 🔁")
+
+        manifest = {
+            "model": EMBEDDING_MODEL,
+            "sources_hash": folder.name,
+            "index": index_kind(db.index),
+            "settings": build_settings(index_kind(db.index)),
+            "documents": documents,
+        }
+        self._save_index(db, folder, manifest, bm25)
+        print(f"FAISS index saved to {folder} 💾")
+        return db, bm25
+
+    def _open_db(self):
+        """(vector DB, BM25 index) for the current sources, ingesting changes if needed"""
+        folder = INDEX_DIR / self._content_hash()
+        if read_manifest(folder) is not None:
+            try:
+                with get_metrics().timer("load_index"):
+                    db = self._load_index(folder)
+                print(f"FAISS index loaded from {folder} ✅")
+                return db, self._load_bm25(folder, db)
+            except Exception as e:
+                print("Saved index unreadable, rebuilding:", e)
+
+        with get_metrics().timer("ingest"):
+            return self._ingest(folder)
+
+    def get_db(self):
+        """Return the vector DB, rebuilding it if a source file changed"""
+        signature = self._source_signature()
+        if self._db is not None and signature == self._signature:
+            return self._db
+
+        with self._lock:
+            if self._db is None or signature != self._signature:
+                if self._db is not None:
+                    print("Travel data changed on disk, reloading index 🔄")
+                self._db, self._bm25 = self._open_db()
+                configure_search(self._db.index)
+                self._places = PlaceIndex.from_csv(self.csv_path)
+                self._signature = signature
+                self.search_cache.clear()
+            return self._db
+
+    def _keyword_matches(self, db, bm25, query, k, exclude=()):
+        """Texts of the top-k BM25 documents, skipping any in exclude"""
+        texts = []
+        if k <= 0 or bm25 is None:
+            return texts
+        for doc_id, _ in bm25.search(query):
+            doc = db.docstore.search(doc_id)
+            text = getattr(doc, "page_content", None)
+            if text is not None and text not in exclude and text not in texts:
+                texts.append(text)
+                if len(texts) == k:
+                    break
+        return texts
+
+    def retrieve(self, query, k=2):
+        """(query embedding, top-k context texts), cached per normalized query.
+
+        A query naming a place from travel.csv gets that row straight from
+        the place index, with no embedding (None) and no vector search; the
+        remaining slots are filled from the keyword index, which finds the
+        guide's chunks under that place's section heading."""
+        db = self.get_db()
+        bm25 = self._bm25
+        metrics = get_metrics()
+        rows = self._places.lookup(query, k)
+        if rows:
+            metrics.inc("travel_events_total", event="place_lookup")
+            return None, rows + self._keyword_matches(db, bm25, query, k - len(rows), exclude=rows)
+
+        key = (normalize_query(query), k)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            metrics.inc("travel_events_total", event="search_cache_hit")
+            return cached
+
+        with metrics.timer("embed_query"):
+            embedding = self.embeddings.embed_query(query)
+        results = hybrid_search(query, embedding, db, bm25, self.reranker, k=k)
+        entry = (embedding, [r.page_content for r in results])
+        # Don't cache results from an index that was swapped out meanwhile
+        if db is self._db:
+            self.search_cache.set(key, entry)
+        return entry
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """Return the knowledge base shared by every session and rerun"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+    return _knowledge_base
@@ -0,0 +1,160 @@
+"""Process-wide Groq gateway: pooled connections, retries and load shedding"""
+import asyncio
+import os
+import random
+import threading
+from collections import Counter, OrderedDict
+
+import groq
+import httpx
+from groq import AsyncGroq
+
+from metrics import get_metrics
+
+# Point at fake_groq_server.py to test without the real API
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL") or None
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "8"))
+# API keys whose pooled clients stay open; the least recently used idle one is closed past this
+MAX_CLIENTS = int(os.environ.get("LLM_MAX_CLIENTS", "32"))
+
+# Cheaper model to use when the requested one is rate limited or every slot is busy
+FALLBACK_MODELS = {
+    "llama-3.1-70b-versatile": "llama-3.1-8b-instant",
+}
+
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError)
+
+
+class LLMGateway:
+    """One pooled AsyncGroq client per API key, shared by every session.
+
+    Clients of up to max_clients keys are kept; beyond that the least
+    recently used one without a request in flight is closed. Retries,
+    fallbacks and requests in flight are exported through metrics. All
+    calls must run on the same event loop (chat_pipeline's background loop)."""
+
+    def __init__(self, base_url=GROQ_BASE_URL, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                 max_retries=MAX_RETRIES, max_clients=MAX_CLIENTS):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.max_clients = max_clients
+        self.in_flight = 0
+        # api key -> client, least recently used first
+        self._clients = OrderedDict()
+        # api key -> requests in flight on its client
+        self._active = Counter()
+        # Close tasks of evicted clients, referenced until they finish
+        self._closing = set()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _client(self, api_key):
+        """Keep-alive client for an API key, created on first use"""
+        client = self._clients.get(api_key)
+        if client is not None:
+            self._clients.move_to_end(api_key)
+        else:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=120,
+                ),
+                timeout=httpx.Timeout(60.0, connect=5.0),
+            )
+            # Retries are handled here so fallbacks and backoff share one policy
+            client = AsyncGroq(api_key=api_key, base_url=self.base_url,
+                               max_retries=0, http_client=http_client)
+            self._clients[api_key] = client
+            self._evict_clients()
+        return client
+
+    def _evict_clients(self):
+        """Close idle clients beyond max_clients, oldest first (never the newest)"""
+        for api_key in list(self._clients)[:-1]:
+            if len(self._clients) <= self.max_clients:
+                break
+            if self._active[api_key]:
+                continue
+            task = asyncio.ensure_future(self._clients.pop(api_key).close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    def _backoff(attempt, error):
+        """Full-jitter exponential backoff, honouring Retry-After when sent"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except (TypeError, ValueError):
+            return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    async def stream_chat(self, api_key, model, messages, meta=None, **params):
+        """Yield answer deltas. Rate limits and 5xx errors are retried until
+        the first token arrives; meta["model"] is set to the model that answered."""
+        meta = {} if meta is None else meta
+        metrics = get_metrics()
+        client = self._client(api_key)
+        # Counted from here, so the client isn't closed while this request waits for a slot
+        self._active[api_key] += 1
+        try:
+            current = model
+            if self._semaphore.locked() and model in FALLBACK_MODELS:
+                current = FALLBACK_MODELS[model]
+                metrics.inc("travel_events_total", event="llm_fallback", model=model)
+
+            async with self._semaphore:
+                self.in_flight += 1
+                metrics.set_gauge("travel_llm_in_flight", self.in_flight)
+                try:
+                    attempt = 0
+                    while True:
+                        meta["model"] = current
+                        started = False
+                        try:
+                            stream = await client.chat.completions.create(
+                                model=current, messages=messages, stream=True, **params
+                            )
+                            async for chunk in stream:
+                                delta = chunk.choices[0].delta.content if chunk.choices else None
+                                if delta:
+                                    started = True
+                                    yield delta
+                            return
+                        except RETRYABLE_ERRORS as e:
+                            if started:
+                                raise
+                            if isinstance(e, groq.RateLimitError) and current in FALLBACK_MODELS:
+                                metrics.inc("travel_events_total", event="llm_fallback", model=current)
+                                current = FALLBACK_MODELS[current]
+                                continue
+                            if attempt >= self.max_retries:
+                                raise
+                            metrics.inc("travel_events_total", event="llm_retry", model=current)
+                            await asyncio.sleep(self._backoff(attempt, e))
+                            attempt += 1
+                finally:
+                    self.in_flight -= 1
+                    metrics.set_gauge("travel_llm_in_flight", self.in_flight)
+        finally:
+            self._active[api_key] -= 1
+            if not self._active[api_key]:
+                del self._active[api_key]
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Return the gateway shared by every session in this process"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,271 @@
+"""Process-wide latency/token histograms, Prometheus text export and a sampling profiler"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Serve /metrics on 127.0.0.1:METRICS_PORT for a local Prometheus scrape (unset = off)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+# Fraction of chat turns run under the sampling profiler
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "travel_guide_cache/profiles"))
+# Innermost frames of a thread that is waiting rather than working; such samples are dropped
+IDLE_FRAMES = {"selectors.py:select", "threading.py:wait", "queue.py:get", "thread.py:_worker"}
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+HELP = {
+    "travel_stage_seconds": "Time spent in each stage of a chat turn or ingestion",
+    "travel_llm_first_token_seconds": "Time from turn start to the first answer token",
+    "travel_llm_seconds": "Time from turn start to the last answer token",
+    "travel_llm_prompt_tokens": "Prompt size sent to the model",
+    "travel_llm_completion_tokens": "Answer size returned by the model",
+    "travel_query_batch_size": "Queries encoded together in one forward pass",
+    "travel_events_total": "Counted events (cache hits, place lookups, errors)",
+    "travel_sessions": "Sessions holding a transcript in this process",
+    "travel_sessions_memory_bytes": "Approximate transcript memory across all sessions",
+    "travel_session_memory_bytes": "Approximate transcript memory of each session",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the shape Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _label_text(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class Metrics:
+    """Named histograms, counters and gauges keyed by label set"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> {sorted label tuple: Histogram}
+        self._histograms = {}
+        # name -> {sorted label tuple: count}
+        self._counters = {}
+        # name -> {sorted label tuple: current value}
+        self._gauges = {}
+        self._server = None
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """Record one observation"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to its current value"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def replace_gauge(self, name, series):
+        """Replace every series of a gauge at once: series is [(labels dict, value)]"""
+        values = {tuple(sorted(labels.items())): value for labels, value in series}
+        with self._lock:
+            self._gauges[name] = values
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block into travel_stage_seconds{stage=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("travel_stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def summary(self):
+        """[(name, labels text, count, mean, p50, p95, p99)] for the admin panel"""
+        rows = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                for key, h in sorted(series.items()):
+                    rows.append((name, _label_text(key), h.count, h.sum / h.count if h.count else 0.0,
+                                 h.quantile(0.5), h.quantile(0.95), h.quantile(0.99)))
+        return rows
+
+    def counters(self):
+        with self._lock:
+            return [(name, _label_text(key), value)
+                    for name, series in sorted(self._counters.items())
+                    for key, value in sorted(series.items())]
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(series.items()):
+                    labels = _label_text(key)
+                    prefix = labels + "," if labels else ""
+                    cumulative = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {h.count}')
+                    suffix = f"{{{labels}}}" if labels else ""
+                    lines.append(f"{name}_sum{suffix} {h.sum}")
+                    lines.append(f"{name}_count{suffix} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    labels = _label_text(key)
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(series.items()):
+                    labels = _label_text(key)
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """Expose /metrics over HTTP on a daemon thread (once per process)"""
+        if self._server is not None or not port:
+            return
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            # Another Streamlit worker already serves this port
+            print("Metrics endpoint not started ❌ :", e)
+            return
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Metrics on http://{host}:{port}/metrics 📊")
+
+
+class SamplingProfiler:
+    """Samples the stacks of the threads working on one request at a fixed interval.
+
+    Only threads passed in or inside watch() are sampled, and samples of a
+    thread that is idly waiting are dropped, so other sessions and idle
+    server threads stay out of the profile. Output is one
+    "frame;frame;frame count" line per distinct stack (the collapsed format
+    flamegraph.pl and speedscope read)."""
+
+    def __init__(self, interval=PROFILE_INTERVAL, threads=()):
+        self.interval = interval
+        self.stacks = Counter()
+        self._threads = set(threads)
+        self._stop = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def watch(self):
+        """Sample the calling thread while the block runs"""
+        ident = threading.get_ident()
+        self._threads.add(ident)
+        try:
+            yield
+        finally:
+            self._threads.discard(ident)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self._threads):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                if stack[0] not in IDLE_FRAMES:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, name):
+        """Stop sampling and write the collapsed stacks to PROFILE_DIR/<name>.folded"""
+        self._stop.set()
+        self._thread.join()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{name}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Profile saved to {path} 🔬")
+        return path
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the metrics registry shared by every session in this process"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+                _metrics.serve()
+    return _metrics
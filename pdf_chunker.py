@@ -0,0 +1,174 @@
+"""Layout-aware PDF chunking: heading-bounded, token-limited, overlapping chunks"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Chunk size and overlap in (approximate) embedding-model tokens
+CHUNK_TOKENS = int(os.environ.get("PDF_CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.environ.get("PDF_CHUNK_OVERLAP", "48"))
+# Processes extracting page text (1 disables the pool)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Below this many pages the pool start-up costs more than it saves
+MIN_POOL_PAGES = int(os.environ.get("PDF_MIN_POOL_PAGES", "64"))
+
+# Word pieces and punctuation; close to (slightly under) a WordPiece token count
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+BULLET_RE = re.compile(r"^\s*([-•*–·▪]|\d+[.)])\s")
+
+
+def count_tokens(text):
+    """Approximate token count of text"""
+    return len(TOKEN_RE.findall(text))
+
+
+def is_heading(line):
+    """Short title-like line: 'Ooty:', 'BUDGET TIPS', 'Travel Guide Sample Data'"""
+    words = line.split()
+    if not 0 < len(words) <= 8 or BULLET_RE.match(line):
+        return False
+    if line.endswith(":"):
+        return True
+    if line[-1] in ".,;!?":
+        return False
+    if not any(c.isalpha() for c in line):
+        return False
+    return line.isupper() or all(w[0].isupper() for w in words if w[0].isalpha())
+
+
+_worker_reader = None
+
+
+def _init_worker(path):
+    """Open the PDF once in each pool process"""
+    global _worker_reader
+    from pypdf import PdfReader
+
+    _worker_reader = PdfReader(path)
+
+
+def _extract_page(number):
+    return _worker_reader.pages[number].extract_text() or ""
+
+
+def iter_page_texts(path, workers=PDF_WORKERS, min_pool_pages=MIN_POOL_PAGES):
+    """(page number, text) in page order, extracted across a process pool.
+
+    At most a few pages per worker are in flight, so memory stays flat
+    however long the PDF is."""
+    from pypdf import PdfReader
+
+    page_count = len(PdfReader(path).pages)
+    workers = min(max(1, workers), page_count)
+    if workers <= 1 or page_count < min_pool_pages:
+        _init_worker(path)
+        for number in range(page_count):
+            yield number, _extract_page(number)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    window = workers * 4
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=_init_worker, initargs=(str(path),)) as pool:
+        pending = {}
+        next_page = 0
+        for number in range(page_count):
+            while next_page < page_count and next_page < number + window:
+                pending[next_page] = pool.submit(_extract_page, next_page)
+                next_page += 1
+            yield number, pending.pop(number).result()
+
+
+def _split_long_line(line, max_tokens):
+    """Break a line with more than max_tokens tokens at word boundaries"""
+    pieces, current, size = [], [], 0
+    for word in line.split():
+        tokens = count_tokens(word)
+        if current and size + tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, size = [], 0
+        current.append(word)
+        size += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+class _ChunkBuilder:
+    """Accumulates lines of one section on one page into overlapping chunks"""
+
+    def __init__(self, max_tokens, overlap):
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.lines = []
+        self.sizes = []
+        self.total = 0
+        self.fresh = False
+
+    def add(self, line):
+        """Add a line; returns the finished chunk text if this one overflowed it"""
+        size = count_tokens(line)
+        finished = None
+        if self.lines and self.total + size > self.max_tokens:
+            finished = self.flush(keep_overlap=True)
+        self.lines.append(line)
+        self.sizes.append(size)
+        self.total += size
+        self.fresh = True
+        return finished
+
+    def flush(self, keep_overlap=False):
+        """Finished chunk text (None if nothing new), keeping a tail for overlap"""
+        text = "\n".join(self.lines) if self.fresh else None
+        kept, kept_sizes, total = [], [], 0
+        if keep_overlap:
+            for line, size in zip(reversed(self.lines), reversed(self.sizes)):
+                if total + size > self.overlap:
+                    break
+                kept.insert(0, line)
+                kept_sizes.insert(0, size)
+                total += size
+        self.lines, self.sizes, self.total, self.fresh = kept, kept_sizes, total, False
+        return text
+
+
+def _chunk_document(source, page, section, number, body):
+    # Imported here so pool workers, which only extract text, start quickly
+    from langchain_core.documents import Document
+
+    content = f"{section}\n{body}" if section else body
+    return Document(page_content=content, metadata={
+        "source": source, "page": page, "section": section, "chunk": number,
+    })
+
+
+def iter_pdf_chunks(path, max_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP, workers=PDF_WORKERS):
+    """Chunk documents for a PDF, streamed page by page.
+
+    A chunk never crosses a heading or a page break; the section heading is
+    repeated at the top of every chunk under it so each embeds with its
+    context. metadata: source, page, section, chunk (index within the page)."""
+    source = str(path)
+    section = ""
+    for page, text in iter_page_texts(path, workers):
+        # The repeated heading counts against the chunk's token budget
+        builder = _ChunkBuilder(max(1, max_tokens - count_tokens(section)), overlap)
+        bodies = []
+        for raw_line in text.splitlines():
+            line = " ".join(raw_line.split())
+            if not line:
+                continue
+            if is_heading(line):
+                bodies.append((section, builder.flush()))
+                section = line.rstrip(":").strip()
+                builder.max_tokens = max(1, max_tokens - count_tokens(section))
+                continue
+            for piece in _split_long_line(line, builder.max_tokens):
+                bodies.append((section, builder.add(piece)))
+        bodies.append((section, builder.flush()))
+
+        number = 0
+        for body_section, body in bodies:
+            if body:
+                yield _chunk_document(source, page, body_section, number, body)
+                number += 1
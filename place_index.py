@@ -0,0 +1,111 @@
+"""Structured destination index over travel.csv for exact place lookups"""
+import csv
+import os
+import re
+
+# Lowercase words only; place names are matched unstemmed (Paris ≠ pari)
+WORD_RE = re.compile(r"[\wऀ-ॿ]+")
+
+# Names shorter than this are matched exactly only, so "parks" never means Paris
+FUZZY_MIN_LENGTH = int(os.environ.get("PLACE_FUZZY_MIN_LENGTH", "6"))
+
+# Other names people use for the places in travel.csv; an "aliases" column
+# in the CSV (separated by ";" or "|") adds to these
+PLACE_ALIASES = {
+    "Bangalore": ["bengaluru", "blr"],
+    "Chennai": ["madras"],
+    "Delhi": ["new delhi", "dilli", "दिल्ली"],
+    "Goa": ["गोवा"],
+    "Kerala": ["keralam", "केरल"],
+    "Ooty": ["udhagamandalam", "ootacamund", "ऊटी"],
+    "Paris": ["पेरिस"],
+}
+
+
+def normalize_place(name):
+    """Lowercase words joined by single spaces: 'New  Delhi!' → 'new delhi'"""
+    return " ".join(WORD_RE.findall(name.lower()))
+
+
+def deletion_variants(word):
+    """word with each single character removed"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def row_text(row):
+    """A CSV row rendered the way CSVLoader renders it for the vector index"""
+    return "\n".join(f"{key.strip()}: {(value or '').strip()}" for key, value in row.items() if key is not None)
+
+
+class PlaceIndex:
+    """Maps normalized place names, aliases and one-typo variants to their CSV row.
+
+    Every key is precomputed at build time (symmetric-delete spelling
+    variants included), so naming a place costs a few dict lookups per
+    query word instead of an embedding and a vector search."""
+
+    def __init__(self, rows, aliases=PLACE_ALIASES):
+        """rows: dicts with a "place" column, as read by csv.DictReader"""
+        self.rows = {}
+        self._exact = {}
+        self._fuzzy = {}
+        self._max_words = 1
+        for row in rows:
+            place = (row.get("place") or "").strip()
+            if not place:
+                continue
+            self.rows[place] = row_text({k: v for k, v in row.items() if k != "aliases"})
+            names = [place, *aliases.get(place, ()), *re.split(r"[;|]", row.get("aliases") or "")]
+            for name in names:
+                key = normalize_place(name)
+                if not key:
+                    continue
+                self._exact.setdefault(key, place)
+                self._max_words = max(self._max_words, key.count(" ") + 1)
+                if len(key) >= FUZZY_MIN_LENGTH and " " not in key:
+                    for variant in deletion_variants(key) | {key}:
+                        self._fuzzy.setdefault(variant, set()).add(place)
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Index travel.csv; an unreadable file gives an empty index"""
+        try:
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                return cls(csv.DictReader(f))
+        except (OSError, csv.Error) as e:
+            print("Place index skipped ❌ :", e)
+            return cls([])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _fuzzy_place(self, word):
+        """Unique place within one edit of word, else None"""
+        if len(word) < FUZZY_MIN_LENGTH:
+            return None
+        candidates = set(self._fuzzy.get(word, ()))
+        for variant in deletion_variants(word):
+            candidates.update(self._fuzzy.get(variant, ()))
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def match(self, query):
+        """Places named in the query, in the order they appear"""
+        words = WORD_RE.findall(query.lower())
+        found = []
+        i = 0
+        while i < len(words):
+            # Longest name first, so "new delhi" wins over "delhi"
+            for size in range(min(self._max_words, len(words) - i), 0, -1):
+                place = self._exact.get(" ".join(words[i:i + size]))
+                if place is not None:
+                    break
+            else:
+                size, place = 1, self._fuzzy_place(words[i])
+            if place is not None and place not in found:
+                found.append(place)
+            i += size
+        return found
+
+    def lookup(self, query, k=2):
+        """Row text for up to k places named in the query, [] for open-ended questions"""
+        return [self.rows[place] for place in self.match(query)[:k]]
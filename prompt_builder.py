@@ -0,0 +1,216 @@
+"""Token-budgeted prompt assembly: retrieved chunks, compressed history, max_tokens"""
+import os
+import re
+from functools import lru_cache
+
+from intent_matcher import IntentMatcher
+from travel_platforms import INTENT_KEYWORDS
+
+# Bump PROMPT_VERSION whenever PROMPT_TEMPLATE changes so cached answers are not reused
+PROMPT_VERSION = "2"
+PROMPT_TEMPLATE = """
+You are Travel Guide Chatbot.
+
+Use this DATA if relevant:
+{rag_context}
+{history}
+Rules:
+- Simple English
+- Friendly
+- If city mentioned, explain using dataset first
+- If not found in dataset, answer normally
+- Help with hotels, trips, tourist places
+
+User Question:
+{user_query}
+"""
+HISTORY_TEMPLATE = """
+Conversation so far (summary):
+{summary}
+"""
+
+# Token budgets for the retrieved DATA and for the summary of earlier turns (0 drops history)
+CONTEXT_TOKENS = int(os.environ.get("PROMPT_CONTEXT_TOKENS", "1200"))
+HISTORY_TOKENS = int(os.environ.get("PROMPT_HISTORY_TOKENS", "300"))
+# Retrieved chunks offered to the builder before budgeting
+PROMPT_CHUNKS = int(os.environ.get("PROMPT_CHUNKS", "4"))
+# Longest line of the history summary per earlier message
+SUMMARY_LINE_TOKENS = 40
+
+# Context window and output cap per Groq model
+MODEL_LIMITS = {
+    "llama-3.1-8b-instant": {"context": 131072, "max_output": 8192},
+    "llama-3.1-70b-versatile": {"context": 131072, "max_output": 8192},
+}
+DEFAULT_LIMITS = {"context": 8192, "max_output": 2048}
+
+# tiktoken encoding closest to each model family's tokenizer, when tiktoken is installed
+MODEL_ENCODINGS = {"llama-3": "cl100k_base"}
+
+# Answer length per detected intent; the largest matching one wins
+ITINERARY_KEYWORDS = ["itinerary", "plan", "day trip", "days", "week", "weekend", "schedule",
+                      "route", "यात्रा योजना"]
+MAX_TOKENS_BY_INTENT = {
+    "Itinerary": 900,
+    "Tourist Places": 600,
+    "Hotels": 400,
+    "Train Tickets": 350,
+    "Bus Tickets": 350,
+    "Flight Tickets": 350,
+}
+DEFAULT_MAX_TOKENS = 600
+
+response_matcher = IntentMatcher({"Itinerary": ITINERARY_KEYWORDS, **INTENT_KEYWORDS})
+
+# Words that point back at earlier turns; other questions are sent (and cached) without history
+FOLLOW_UP_WORDS = {"it", "its", "there", "that", "this", "those", "these", "they", "them",
+                   "also", "more", "same", "else", "again", "instead", "above", "previous"}
+
+WORD_RE = re.compile(r"\S+")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    """tiktoken encoding for a model, None to fall back to the estimate"""
+    for prefix, name in MODEL_ENCODINGS.items():
+        if model.startswith(prefix):
+            try:
+                import tiktoken
+
+                return tiktoken.get_encoding(name)
+            except Exception:
+                return None
+    return None
+
+
+def count_tokens(text, model=""):
+    """Token count of text for a model (estimated when no tokenizer is available)"""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # BPE vocabularies average ~4 characters per token on English text;
+    # the word count keeps short-word and non-Latin text from undercounting
+    return max(len(text) // 4, len(WORD_RE.findall(text)))
+
+
+def truncate_tokens(text, limit, model=""):
+    """Longest word-prefix of text that fits in limit tokens"""
+    if count_tokens(text, model) <= limit:
+        return text
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:mid]), model) <= limit:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low]) + " …" if low else ""
+
+
+def dedupe_chunks(chunks):
+    """Drop lines already seen in a higher-ranked chunk (overlaps between
+    neighbouring PDF chunks, a CSV row also found in the PDF); a chunk with
+    nothing new left is dropped, one that keeps new lines keeps its heading."""
+    seen = set()
+    kept = []
+    for chunk in chunks:
+        lines = [line for line in chunk.splitlines() if line.strip()]
+        if not lines:
+            continue
+        new = [line for line in lines[1:] if line.strip().lower() not in seen]
+        heading_new = lines[0].strip().lower() not in seen
+        if not new and not heading_new:
+            continue
+        kept.append("\n".join([lines[0], *new]))
+        seen.update(line.strip().lower() for line in lines)
+    return kept
+
+
+def fit_chunks(chunks, budget, model=""):
+    """Highest-ranked chunks that fit in budget tokens; the first is truncated if it alone is too big"""
+    fitted = []
+    used = 0
+    for chunk in chunks:
+        tokens = count_tokens(chunk, model) + 1
+        if used + tokens > budget:
+            if not fitted:
+                fitted.append(truncate_tokens(chunk, budget, model))
+            break
+        fitted.append(chunk)
+        used += tokens
+    return fitted
+
+
+def summarize_history(messages, budget, model=""):
+    """Extractive summary of earlier turns, newest kept first when over budget.
+
+    Each message is cut to its first sentence, so a long chat costs a
+    bounded number of tokens and no extra LLM call."""
+    if budget <= 0:
+        return ""
+    lines = []
+    used = 0
+    started = False
+    turns = []
+    for message in messages:
+        # Skip the greeting shown before the user said anything
+        started = started or message.get("role") == "user"
+        if started:
+            turns.append(message)
+    for message in reversed(turns):
+        text = " ".join(str(message.get("content", "")).split())
+        first_sentence = SENTENCE_END_RE.split(text, 1)[0]
+        speaker = "User" if message.get("role") == "user" else "Assistant"
+        line = f"- {speaker}: {truncate_tokens(first_sentence, SUMMARY_LINE_TOKENS, model)}"
+        tokens = count_tokens(line, model) + 1
+        if used + tokens > budget:
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(reversed(lines))
+
+
+def is_follow_up(user_query):
+    """True when the question refers back to the conversation"""
+    return not FOLLOW_UP_WORDS.isdisjoint(re.findall(r"\w+", user_query.lower()))
+
+
+def pick_max_tokens(user_query, model="", prompt_tokens=0):
+    """Answer length for the query's intent, within the model's limits"""
+    intents = response_matcher.match(user_query)
+    wanted = max((MAX_TOKENS_BY_INTENT.get(intent, DEFAULT_MAX_TOKENS) for intent in intents),
+                 default=DEFAULT_MAX_TOKENS)
+    limits = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+    return max(1, min(wanted, limits["max_output"], limits["context"] - prompt_tokens))
+
+
+class Prompt:
+    """An assembled prompt and the settings it should be sent with"""
+
+    def __init__(self, text, context, history, max_tokens, tokens):
+        self.text = text
+        self.context = context
+        self.history = history
+        self.max_tokens = max_tokens
+        self.tokens = tokens
+
+    @property
+    def cache_key(self):
+        """Everything besides the question that shapes the answer"""
+        return f"{self.context}\0{self.history}" if self.history else self.context
+
+
+def build_prompt(user_query, chunks, history=(), model="",
+                 context_tokens=CONTEXT_TOKENS, history_tokens=HISTORY_TOKENS):
+    """Fit retrieved chunks and, for follow-up questions, earlier turns into their budgets"""
+    context = "\n".join(fit_chunks(dedupe_chunks(chunks), context_tokens, model))
+    summary = summarize_history(history, history_tokens, model) if is_follow_up(user_query) else ""
+    text = PROMPT_TEMPLATE.format(
+        rag_context=context,
+        history=HISTORY_TEMPLATE.format(summary=summary) if summary else "",
+        user_query=user_query,
+    )
+    tokens = count_tokens(text, model)
+    return Prompt(text, context, summary, pick_max_tokens(user_query, model, tokens), tokens)
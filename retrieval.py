@@ -0,0 +1,146 @@
+"""Hybrid retrieval: BM25 keyword index fused with FAISS results, then reranked"""
+import heapq
+import math
+import os
+import time
+from collections import Counter
+
+from intent_matcher import tokenize
+from metrics import get_metrics
+
+# Candidates pulled from each retriever before fusion
+RETRIEVAL_DEPTH = int(os.environ.get("RETRIEVAL_DEPTH", "20"))
+# Fused candidates handed to the reranker
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", "8"))
+# Skip reranking when vector + keyword search already used this many milliseconds
+RERANK_BUDGET_MS = float(os.environ.get("RERANK_BUDGET_MS", "150"))
+# Cross-encoder for reranking; empty falls back to the lexical reranker
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+
+class BM25Index:
+    """Inverted index over document text with Okapi BM25 scoring"""
+
+    def __init__(self, documents=(), k1=1.5, b=0.75):
+        """documents: iterable of (doc id, text)"""
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self.doc_lengths = []
+        self.postings = {}
+        self.total_length = 0
+        self._idf = None
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def add(self, doc_id, text):
+        """Index one more document"""
+        position = len(self.doc_ids)
+        tokens = tokenize(text)
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((position, tf))
+        self._idf = None
+
+    @property
+    def avg_length(self):
+        return self.total_length / len(self.doc_ids) if self.doc_ids else 0.0
+
+    @property
+    def idf(self):
+        """Inverse document frequency per term, recomputed after additions"""
+        if self._idf is None:
+            count = len(self.doc_ids)
+            self._idf = {
+                term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for term, docs in self.postings.items()
+            }
+        return self._idf
+
+    def search(self, query, k=RETRIEVAL_DEPTH):
+        """[(doc id, score)] for the k best matches"""
+        scores = {}
+        idf_table = self.idf
+        avg_length = self.avg_length or 1
+        for term in set(tokenize(query)):
+            idf = idf_table.get(term)
+            if idf is None:
+                continue
+            for position, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / avg_length)
+                scores[position] = scores.get(position, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[position], score) for position, score in best]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Merge ranked id lists; ids ranked high by any list float to the top"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalReranker:
+    """Scores by how many query terms a passage covers; no model needed"""
+
+    def score(self, query, passages):
+        terms = set(tokenize(query))
+        if not terms:
+            return [0.0] * len(passages)
+        return [len(terms & set(tokenize(passage))) / len(terms) for passage in passages]
+
+
+class CrossEncoderReranker:
+    """Small sentence-transformers cross-encoder, run on CPU"""
+
+    def __init__(self, model_name=RERANK_MODEL):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query, passages):
+        return [float(s) for s in self.model.predict([(query, p) for p in passages], show_progress_bar=False)]
+
+
+def load_reranker():
+    """Cross-encoder when available, lexical overlap otherwise"""
+    if RERANK_MODEL:
+        try:
+            return CrossEncoderReranker(RERANK_MODEL)
+        except Exception as e:
+            print("Cross-encoder unavailable, using lexical reranker:", e)
+    return LexicalReranker()
+
+
+def hybrid_search(query, query_embedding, db, bm25, reranker, k=2,
+                  depth=RETRIEVAL_DEPTH, rerank_candidates=RERANK_CANDIDATES,
+                  rerank_budget_ms=RERANK_BUDGET_MS):
+    """Top-k documents from FAISS and BM25 results fused by rank, then reranked"""
+    metrics = get_metrics()
+    start = time.perf_counter()
+    with metrics.timer("vector_search"):
+        vector_docs = db.similarity_search_by_vector(query_embedding, k=depth)
+    docs = {doc.id: doc for doc in vector_docs}
+    rankings = [[doc.id for doc in vector_docs]]
+    if bm25 is not None:
+        with metrics.timer("bm25_search"):
+            rankings.append([doc_id for doc_id, _ in bm25.search(query, depth)])
+
+    candidates = []
+    for doc_id in reciprocal_rank_fusion(rankings)[:rerank_candidates]:
+        doc = docs.get(doc_id) or db.docstore.search(doc_id)
+        if hasattr(doc, "page_content"):
+            candidates.append(doc)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if reranker is not None and len(candidates) > k and elapsed_ms < rerank_budget_ms:
+        with metrics.timer("rerank"):
+            scores = reranker.score(query, [doc.page_content for doc in candidates])
+        # sorted() is stable, so ties keep their fused order
+        order = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        candidates = [candidates[i] for i in order]
+    return candidates[:k]
@@ -0,0 +1,202 @@
+"""Per-session transcript limits and server-wide eviction of idle sessions' messages"""
+import os
+import sys
+import threading
+import time
+import weakref
+
+from metrics import get_metrics
+
+# Messages a session keeps in memory; older ones are read back from the history store
+SESSION_MESSAGES = int(os.environ.get("SESSION_MESSAGES", "40"))
+# Transcript memory across all sessions before idle ones are spilled to the history store
+SESSION_MEMORY_MB = float(os.environ.get("SESSION_MEMORY_MB", "128"))
+# Only sessions idle this long are spilled
+SESSION_IDLE_SECONDS = float(os.environ.get("SESSION_IDLE_SECONDS", "300"))
+
+
+def message_bytes(message):
+    """Approximate memory held by one message dict and its values"""
+    size = sys.getsizeof(message)
+    for key, value in message.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    return size
+
+
+class Transcript:
+    """One session's in-memory messages: the tail of a conversation.
+
+    Positions [0, offset) live only in the history store and [0, saved) are
+    known to be there, so only messages below saved may be dropped. A
+    transcript started with replace=True (a new or cleared chat) overwrites
+    the stored conversation on its first save instead of appending to it."""
+
+    def __init__(self, messages, offset=0, saved=None, replace=False):
+        self._lock = threading.Lock()
+        self.messages = list(messages)
+        self.offset = offset
+        self.saved = offset if saved is None else saved
+        self.replace = replace
+        # (start, messages) paged in from the store for "Load earlier"
+        self.earlier = (offset, [])
+        # Set when the manager dropped every saved message; restore() reloads a tail
+        self.spilled = False
+
+    @property
+    def total(self):
+        return self.offset + len(self.messages)
+
+    def append(self, message):
+        with self._lock:
+            self.messages.append(message)
+
+    def mark_saved(self):
+        """Everything in memory is now in the history store"""
+        with self._lock:
+            self.saved = self.offset + len(self.messages)
+            self.replace = False
+
+    def spill(self, keep):
+        """Drop saved messages so at most keep remain in memory; returns how many went.
+
+        keep=0 also drops the older messages paged in for display. The lists
+        are replaced, not edited, so a rerun reading them meanwhile still sees
+        a consistent (if stale) transcript."""
+        with self._lock:
+            drop = max(0, min(len(self.messages) - keep, self.saved - self.offset))
+            paged = len(self.earlier[1]) if keep == 0 else 0
+            if drop:
+                self.messages = self.messages[drop:]
+                self.offset += drop
+                # The paged-in block no longer joins up with the in-memory tail
+                self.earlier = (self.offset, [])
+                self.spilled = self.spilled or keep == 0
+            elif paged:
+                self.earlier = (self.offset, [])
+            return drop + paged
+
+    def restore(self, offset, older):
+        """Put back the stored messages before the in-memory ones after a spill"""
+        with self._lock:
+            if self.offset == offset + len(older):
+                self.messages = list(older) + self.messages
+                self.offset = offset
+                self.earlier = (offset, [])
+            self.spilled = False
+
+    def memory_bytes(self):
+        with self._lock:
+            messages = self.messages + self.earlier[1]
+        return sys.getsizeof(messages) + sum(message_bytes(message) for message in messages)
+
+
+class SessionManager:
+    """Tracks every session's transcript and keeps their total memory under budget"""
+
+    def __init__(self, max_messages=SESSION_MESSAGES, budget_mb=SESSION_MEMORY_MB,
+                 idle_seconds=SESSION_IDLE_SECONDS):
+        self.max_messages = max_messages
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        # session id -> Transcript; a session Streamlit drops disappears by itself
+        self._transcripts = weakref.WeakValueDictionary()
+        # session id -> (last active monotonic time, bytes at last measure)
+        self._usage = {}
+        # session id -> callable that releases what the session holds open, e.g. its log
+        self._release = {}
+        # Release callables of sessions spilled or gone, run outside the lock
+        self._released = []
+
+    def touch(self, session_id, transcript, release=None):
+        """Mark a session active, cap its transcript and evict idle sessions if over budget.
+
+        release is called once the session is spilled or has ended."""
+        transcript.spill(self.max_messages)
+        size = transcript.memory_bytes()
+        with self._lock:
+            self._transcripts[session_id] = transcript
+            self._usage[session_id] = (time.monotonic(), size)
+            if release is not None:
+                self._release[session_id] = release
+            evicted = self._evict(exclude=session_id)
+            self._publish()
+            released, self._released = self._released, []
+        for session_id in evicted:
+            print(f"Spilled idle session {session_id} to the history store 💤")
+        for release in released:
+            try:
+                release()
+            except Exception as e:
+                # Cleanup for an ended session must not fail this session's rerun
+                print(f"Could not release a session's conversation: {e}")
+
+    def _live(self):
+        """[(session id, transcript, last active, bytes)], forgetting sessions that are gone"""
+        live = []
+        for session_id in list(self._usage):
+            transcript = self._transcripts.get(session_id)
+            if transcript is None:
+                del self._usage[session_id]
+                self._release_session(session_id)
+                continue
+            live.append((session_id, transcript, *self._usage[session_id]))
+        return live
+
+    def _evict(self, exclude):
+        live = self._live()
+        total = sum(size for *_, size in live)
+        if total <= self.budget_bytes:
+            return []
+        evicted = []
+        now = time.monotonic()
+        # Longest idle first
+        for session_id, transcript, last_active, size in sorted(live, key=lambda item: item[2]):
+            if total <= self.budget_bytes or now - last_active < self.idle_seconds:
+                break
+            if session_id == exclude or not transcript.spill(0):
+                continue
+            remaining = transcript.memory_bytes()
+            total -= size - remaining
+            self._usage[session_id] = (last_active, remaining)
+            self._release_session(session_id)
+            get_metrics().inc("travel_events_total", event="session_evicted")
+            evicted.append(session_id)
+        return evicted
+
+    def _release_session(self, session_id):
+        release = self._release.pop(session_id, None)
+        if release is not None:
+            self._released.append(release)
+
+    def _publish(self):
+        live = self._live()
+        metrics = get_metrics()
+        metrics.set_gauge("travel_sessions", len(live))
+        metrics.set_gauge("travel_sessions_memory_bytes", sum(size for *_, size in live))
+        metrics.replace_gauge("travel_session_memory_bytes",
+                              [({"session": session_id}, size) for session_id, _, _, size in live])
+
+    def usage(self):
+        """[(session id, bytes, messages in memory, idle seconds)], largest first"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [(session_id, size, len(transcript.messages), now - last_active)
+                    for session_id, transcript, last_active, size in self._live()]
+        return sorted(rows, key=lambda row: -row[1])
+
+
+_session_manager = None
+_session_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    """Return the session manager shared by every session in this process"""
+    global _session_manager
+    if _session_manager is None:
+        with _session_manager_lock:
+            if _session_manager is None:
+                _session_manager = SessionManager()
+    return _session_manager
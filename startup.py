@@ -0,0 +1,113 @@
+"""Staged startup: the UI renders at once while the retrieval stack warms up"""
+import importlib
+import threading
+import time
+
+# Seconds a thin client waits for the API server to report ready
+API_CONNECT_TIMEOUT = 120
+
+# (stage, modules) imported by the warm-up thread, timed one stage at a time
+IMPORT_STAGES = [
+    ("Import LangChain + FAISS", ["langchain_community.vectorstores", "langchain_community.document_loaders", "faiss"]),
+    ("Import sentence-transformers", ["sentence_transformers"]),
+    ("Import Groq client", ["groq", "httpx", "llm_gateway"]),
+]
+
+
+class Startup:
+    """Runs the warm-up stages on a background thread and records how long each took"""
+
+    def __init__(self, api_client=None):
+        self.api_client = api_client
+        self.ready = threading.Event()
+        self.stage = "Starting"
+        self.error = None
+        # stage -> seconds, in the order the stages finished
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, stage, seconds):
+        """Add a timing measured outside the warm-up thread (e.g. the UI imports)"""
+        with self._lock:
+            self.timings.setdefault(stage, seconds)
+
+    def _timed(self, stage, fn):
+        self.stage = stage
+        start = time.perf_counter()
+        result = fn()
+        self.record(stage, time.perf_counter() - start)
+        return result
+
+    def _wait_for_api(self):
+        """Thin-client warm-up: poll the API server until its own warm-up is done"""
+        deadline = time.monotonic() + API_CONNECT_TIMEOUT
+        while True:
+            try:
+                health = self.api_client.health()
+                if health.get("ready"):
+                    return
+                self.stage = f"API server: {health.get('stage')}"
+            except Exception as e:
+                if time.monotonic() > deadline:
+                    raise
+                self.stage = f"Waiting for API server ({type(e).__name__})"
+            if time.monotonic() > deadline:
+                raise TimeoutError("API server not ready")
+            time.sleep(1.0)
+
+    def _warm_up(self):
+        from caching import get_semantic_cache
+        from knowledge_base import get_knowledge_base
+
+        start = time.perf_counter()
+        try:
+            if self.api_client is not None:
+                self._timed("Connect to API server", self._wait_for_api)
+                return
+            for stage, modules in IMPORT_STAGES:
+                self._timed(stage, lambda: [importlib.import_module(name) for name in modules])
+            knowledge_base = get_knowledge_base()
+            self._timed("Load embedding model", lambda: knowledge_base.embeddings)
+            self._timed("Load or build index", knowledge_base.get_db)
+            self._timed("Load reranker", lambda: knowledge_base.reranker)
+            self._timed("Open answer cache", get_semantic_cache)
+        except Exception as e:
+            self.error = e
+            print(f"Warm-up failed during {self.stage} ❌ :", repr(e))
+        finally:
+            self.stage = "Ready" if self.error is None else "Failed"
+            self.ready.set()
+
+        print(f"Warm-up finished in {time.perf_counter() - start:.2f}s 🚀")
+        for stage, seconds in self.report():
+            print(f"  {seconds:7.3f}s  {stage}")
+
+    def start(self):
+        """Start warming up once; later calls do nothing"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._warm_up, name="warm-up", daemon=True)
+                self._thread.start()
+
+    def report(self):
+        """[(stage, seconds)], slowest first"""
+        with self._lock:
+            return sorted(self.timings.items(), key=lambda item: -item[1])
+
+
+_startup = None
+_startup_lock = threading.Lock()
+
+
+def get_startup(api_client=None):
+    """Return this process's startup tracker, starting the warm-up on first call.
+
+    With an api_client the process is a thin client and only waits for the API."""
+    global _startup
+    if _startup is None:
+        with _startup_lock:
+            if _startup is None:
+                _startup = Startup(api_client)
+                _startup.start()
+    return _startup
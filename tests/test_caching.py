@@ -0,0 +1,73 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from caching import SemanticCache
+
+CONTEXT, MODEL, VERSION = "context", "m", "v1"
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = Path(self._dir.name) / "answers.sqlite3"
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def cache(self, **kwargs):
+        cache = SemanticCache(self.path, **{"threshold": 0.95, "maxsize": 10, "ttl": 60, **kwargs})
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def rows(self):
+        with sqlite3.connect(str(self.path)) as conn:
+            return [row[0] for row in conn.execute("SELECT answer FROM answers ORDER BY id")]
+
+    def test_similarity_threshold(self):
+        cache = self.cache()
+        cache.store("hotel in goa", [1.0, 0.0], CONTEXT, MODEL, VERSION, "goa hotels")
+        # cos = 0.98 and 0.8
+        self.assertEqual(cache.lookup([0.98, 0.199], CONTEXT, MODEL, VERSION), "goa hotels")
+        self.assertIsNone(cache.lookup([0.8, 0.6], CONTEXT, MODEL, VERSION))
+        # Same vector but other context, model or prompt version
+        self.assertIsNone(cache.lookup([1.0, 0.0], "other", MODEL, VERSION))
+        self.assertIsNone(cache.lookup([1.0, 0.0], CONTEXT, "other", VERSION))
+        self.assertIsNone(cache.lookup([1.0, 0.0], CONTEXT, MODEL, "v2"))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_entries_expire(self):
+        with mock.patch("caching.time.time", return_value=1000.0):
+            cache = self.cache(ttl=60)
+            cache.store("hotel in goa", [1.0, 0.0], CONTEXT, MODEL, VERSION, "goa hotels")
+        with mock.patch("caching.time.time", return_value=1059.0):
+            self.assertEqual(cache.lookup([1.0, 0.0], CONTEXT, MODEL, VERSION), "goa hotels")
+        with mock.patch("caching.time.time", return_value=1061.0):
+            self.assertIsNone(cache.lookup([1.0, 0.0], CONTEXT, MODEL, VERSION))
+            # Expired rows are deleted when the cache is next opened
+            self.cache()
+        self.assertEqual(self.rows(), [])
+
+    def test_maxsize_evicts_oldest(self):
+        cache = self.cache(maxsize=2)
+        for i, vector in enumerate(([1.0, 0.0], [0.0, 1.0], [-1.0, 0.0])):
+            cache.store(f"q{i}", vector, CONTEXT, MODEL, VERSION, f"a{i}")
+        self.assertIsNone(cache.lookup([1.0, 0.0], CONTEXT, MODEL, VERSION))
+        self.assertEqual(cache.lookup([-1.0, 0.0], CONTEXT, MODEL, VERSION), "a2")
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertEqual(self.rows(), ["a1", "a2"])
+        self.assertEqual(self.cache(maxsize=2).stats()["size"], 2)
+
+    def test_exact_match_without_embedding(self):
+        cache = self.cache()
+        cache.store("Hotel in Goa?", None, CONTEXT, MODEL, VERSION, "goa hotels")
+        self.assertEqual(cache.lookup(None, CONTEXT, MODEL, VERSION, "hotel in  goa"), "goa hotels")
+        self.assertIsNone(cache.lookup(None, CONTEXT, MODEL, VERSION, "hotel in ooty"))
+        # Survives a restart
+        self.assertEqual(self.cache().lookup(None, CONTEXT, MODEL, VERSION, "hotel in goa"), "goa hotels")
+
+
+if __name__ == "__main__":
+    unittest.main()
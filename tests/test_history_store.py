@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+
+from history_store import HistoryStore
+
+
+def turn(question, answer):
+    return [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+
+
+class HistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(self._dir.name)
+
+    def tearDown(self):
+        self.store.close_all()
+        self.store._conn.close()
+        self._dir.cleanup()
+
+    def save(self, messages, offset=0, replace=False):
+        self.store.save("c1", None, "2026-01-01T00:00:00", messages, "m", offset=offset, replace=replace)
+
+    def test_append_only_writes_new_messages(self):
+        welcome = [{"role": "assistant", "content": "Welcome"}]
+        self.save(welcome + turn("hotel in goa", "a1"))
+        self.save(welcome + turn("hotel in goa", "a1") + turn("train to delhi", "a2"))
+        self.assertEqual(len(self.store.load("c1")), 5)
+
+    def test_clear_then_save_replaces_log(self):
+        old = [{"role": "assistant", "content": "Welcome"}] + turn("hotel in goa", "a1")
+        self.save(old)
+        # Clear Chat keeps the conversation id; the new transcript is just as long
+        cleared = [{"role": "assistant", "content": "Chat cleared!"}] + turn("bus to ooty", "a2")
+        self.save(cleared, replace=True)
+        self.assertEqual(self.store.load("c1"), cleared)
+
+        self.save(cleared + turn("and back?", "a3"))
+        self.assertEqual(self.store.load("c1"), cleared + turn("and back?", "a3"))
+        self.assertEqual(self.store.list_conversations()["c1"]["messages_count"], 5)
+
+    def test_replace_keeps_messages_before_offset(self):
+        first = turn("q1", "a1") + turn("q2", "a2")
+        self.save(first)
+        self.save(turn("q3", "a3"), offset=2, replace=True)
+        self.assertEqual(self.store.load("c1"), turn("q1", "a1") + turn("q3", "a3"))
+
+    def test_reopen_takes_count_from_index(self):
+        messages = turn("q1", "a1") + turn("q2", "a2")
+        self.save(messages)
+        self.store.close("c1")
+        self.assertEqual(self.store.load_tail("c1", 3), (1, messages[1:]))
+        # A reopened log appends after the indexed count without rereading the file
+        self.save(messages + turn("q3", "a3"), offset=0)
+        self.store.close("c1")
+        self.assertEqual(self.store.load("c1"), messages + turn("q3", "a3"))
+
+    def test_log_changed_behind_the_index_is_recounted(self):
+        self.save(turn("q1", "a1"))
+        self.store.close("c1")
+        with open(self.store._log_path("c1"), "a", encoding="utf-8") as f:
+            f.write('{"role": "user", "content": "q2"}\n{"role": "assis')
+        self.assertEqual(self.store.load_tail("c1", 5), (0, turn("q1", "a1") + [{"role": "user", "content": "q2"}]))
+        self.save(turn("q1", "a1") + turn("q2", "a2"))
+        self.assertEqual(self.store.load("c1"), turn("q1", "a1") + turn("q2", "a2"))
+
+    def test_open_logs_are_capped(self):
+        self.store.max_open_logs = 3
+        for i in range(10):
+            self.store.save(f"c{i}", None, "2026-01-01T00:00:00", turn(f"q{i}", "a"), "m")
+        self.assertEqual(list(self.store._logs), ["c7", "c8", "c9"])
+        # An evicted conversation reopens where it left off
+        self.store.save("c0", None, "2026-01-01T00:00:00", turn("q0", "a") + turn("q", "a"), "m")
+        self.assertEqual(self.store.load("c0"), turn("q0", "a") + turn("q", "a"))
+        self.assertEqual(len(self.store._logs), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from intent_matcher import IntentMatcher, stem
+from travel_platforms import get_platform_suggestions
+
+
+class IntentMatcherTest(unittest.TestCase):
+    def test_substrings_do_not_match(self):
+        # "air" is inside "repair", "see" inside "overseas"
+        self.assertEqual(get_platform_suggestions("my car needs repair"), {})
+        self.assertNotIn("Tourist Places", get_platform_suggestions("moving overseas for work"))
+        self.assertNotIn("Flight Tickets", get_platform_suggestions("moving overseas for work"))
+
+    def test_stemmed_words_match(self):
+        self.assertIn("Bus Tickets", get_platform_suggestions("any buses to ooty?"))
+        self.assertIn("Hotels", get_platform_suggestions("booking hotels in goa"))
+        self.assertIn("Tourist Places", get_platform_suggestions("I planned a week in kerala"))
+
+    def test_stem(self):
+        self.assertEqual([stem(w) for w in ("buses", "booking", "planned", "hotels", "cities")],
+                         ["bus", "book", "plan", "hotel", "city"])
+
+    def test_phrases_and_table_order(self):
+        matcher = IntentMatcher({"Hotels": ["guest house"], "Bus Tickets": ["bus"]})
+        self.assertEqual(matcher.match("bus to a guest house"), ["Hotels", "Bus Tickets"])
+        self.assertEqual(matcher.match("a house for guests"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import gc
+import unittest
+
+from session_manager import SessionManager, Transcript
+
+
+def messages(count):
+    return [{"role": "user", "content": f"message {i}"} for i in range(count)]
+
+
+class TranscriptTest(unittest.TestCase):
+    def test_spill_never_drops_unsaved_messages(self):
+        transcript = Transcript(messages(10), saved=4)
+        self.assertEqual(transcript.spill(2), 4)
+        self.assertEqual((transcript.offset, transcript.messages), (4, messages(10)[4:]))
+        # Nothing saved is left in memory, so even keep=0 drops nothing more
+        self.assertEqual(transcript.spill(0), 0)
+        self.assertEqual(transcript.total, 10)
+        self.assertFalse(transcript.spilled)
+
+        transcript.mark_saved()
+        self.assertEqual(transcript.spill(0), 6)
+        self.assertEqual((transcript.offset, transcript.messages), (10, []))
+        self.assertTrue(transcript.spilled)
+
+    def test_spill_keeps_the_newest_messages(self):
+        transcript = Transcript(messages(10), saved=10)
+        self.assertEqual(transcript.spill(3), 7)
+        self.assertEqual(transcript.messages, messages(10)[7:])
+        self.assertFalse(transcript.spilled)
+
+    def test_keep_zero_clears_paged_in_history(self):
+        transcript = Transcript(messages(5), offset=20, saved=25)
+        transcript.earlier = (10, messages(10))
+        # Trimming to keep=5 drops nothing and leaves the paged-in block alone
+        self.assertEqual(transcript.spill(5), 0)
+        self.assertEqual(len(transcript.earlier[1]), 10)
+        self.assertEqual(transcript.spill(0), 15)
+        self.assertEqual(transcript.earlier, (25, []))
+
+    def test_restore_only_when_offsets_line_up(self):
+        older = messages(10)
+        transcript = Transcript(older, saved=10)
+        transcript.spill(0)
+        transcript.append({"role": "user", "content": "new"})
+
+        transcript.restore(2, older[2:9])  # ends at 9, the transcript starts at 10
+        self.assertEqual(transcript.offset, 10)
+        self.assertEqual(len(transcript.messages), 1)
+        self.assertFalse(transcript.spilled)
+
+        transcript.restore(4, older[4:])
+        self.assertEqual(transcript.offset, 4)
+        self.assertEqual(transcript.messages, older[4:] + [{"role": "user", "content": "new"}])
+
+
+class SessionManagerTest(unittest.TestCase):
+    def setUp(self):
+        # No budget and no idle grace: every other session is evicted on each touch
+        self.manager = SessionManager(max_messages=40, budget_mb=0, idle_seconds=0)
+        self.released = []
+
+    def release(self, session_id):
+        return lambda: self.released.append(session_id)
+
+    def test_spilled_session_is_released(self):
+        first = Transcript(messages(4), saved=4)
+        self.manager.touch("s1", first, self.release("s1"))
+        self.manager.touch("s2", Transcript(messages(4), saved=4), self.release("s2"))
+        self.assertTrue(first.spilled)
+        self.assertEqual(self.released, ["s1"])
+
+    def test_ended_session_is_released(self):
+        self.manager.budget_bytes = 1 << 30
+        ended = Transcript(messages(2))
+        self.manager.touch("s1", ended, self.release("s1"))
+        del ended
+        gc.collect()
+        active = Transcript(messages(2))
+        self.manager.touch("s2", active)
+        self.assertEqual(self.released, ["s1"])
+        self.assertEqual([row[0] for row in self.manager.usage()], ["s2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
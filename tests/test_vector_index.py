@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+import vector_index
+from vector_index import compact_index, delete_documents, flat_index, index_kind
+
+
+def make_store(vectors, mode):
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    docstore = InMemoryDocstore({doc_id: Document(page_content=doc_id, id=doc_id) for doc_id in ids})
+    return FAISS(None, compact_index(flat, mode), docstore, dict(enumerate(ids)))
+
+
+def decoded(db):
+    """doc id -> the vector its position decodes to"""
+    import faiss
+
+    index = faiss.downcast_index(db.index)
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return {doc_id: index.reconstruct(position) for position, doc_id in db.index_to_docstore_id.items()}
+
+
+class DeleteDocumentsTest(unittest.TestCase):
+    def setUp(self):
+        self._min_documents = vector_index.INDEX_MIN_DOCUMENTS
+        vector_index.INDEX_MIN_DOCUMENTS = 0
+        self.vectors = np.random.default_rng(0).normal(size=(1500, 32)).astype("float32")
+
+    def tearDown(self):
+        vector_index.INDEX_MIN_DOCUMENTS = self._min_documents
+
+    def check_delete(self, mode):
+        db = make_store(self.vectors, mode)
+        self.assertEqual(index_kind(db.index), mode)
+        before = decoded(db)
+        removed = {f"doc-{i}" for i in (0, 7, 700, 1499)}
+        delete_documents(db, removed)
+
+        self.assertEqual(db.index.ntotal, 1500 - len(removed))
+        self.assertEqual(sorted(db.index_to_docstore_id), list(range(db.index.ntotal)))
+        after = decoded(db)
+        self.assertEqual(set(after), set(before) - removed)
+        for doc_id, vector in after.items():
+            # Each kept position still holds its own document's vector
+            np.testing.assert_allclose(vector, before[doc_id], atol=1e-3)
+            self.assertEqual(db.docstore.search(doc_id).page_content, doc_id)
+        for doc_id in removed:
+            self.assertNotIsInstance(db.docstore.search(doc_id), type(db.docstore.search("doc-1")))
+
+    def test_delete_ivfpq(self):
+        self.check_delete("ivfpq")
+
+    def test_delete_hnsw_sq(self):
+        self.check_delete("hnsw_sq")
+
+    def test_flat_index_keeps_positions(self):
+        db = make_store(self.vectors, "ivfpq")
+        before = decoded(db)
+        db.index = flat_index(db.index)
+        self.assertEqual(index_kind(db.index), "flat")
+        for doc_id, vector in decoded(db).items():
+            np.testing.assert_allclose(vector, before[doc_id], atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
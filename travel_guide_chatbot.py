@@ -1,57 +1,13 @@
-import streamlit as st
-import os
-from groq import Groq
 import time
-from datetime import datetime
-import json
-from pathlib import Path
-from PIL import Image
-import base64
-import io
-
-
-from langchain_community.document_loaders import CSVLoader, PyPDFLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-
-
-docs = []
-
-# Load CSV safely
-try:
-    csv_loader = CSVLoader(file_path="travel.csv")
-    csv_docs = csv_loader.load()
-    docs.extend(csv_docs)
-    print("CSV loaded ✅")
-except Exception as e:
-    print("CSV error:", e)
-
-# Load PDF safely (IMPORTANT)
-try:
-    pdf_loader = PyPDFLoader("travel.pdf")
-    pdf_docs = pdf_loader.load()
-    docs.extend(pdf_docs)
-    print("PDF loaded ✅")
-except Exception as e:
-    print("PDF skipped ❌ :", e)
-
-print(f"Total documents loaded: {len(docs)}")
-
-# Embeddings
-embeddings = HuggingFaceEmbeddings()
-
-# Vector DB
-db = FAISS.from_documents(docs, embeddings)
-
-def rag_search(query):
-    results = db.similarity_search(query, k=2)
-    return "\n".join([r.page_content for r in results])
+_import_start = time.perf_counter()
 
+import streamlit as st
 
 # ════════════════════════════════════════════════════════════════════════════════════
 # 🏨 TRAVEL GUIDE CHATBOT - PLATFORM BOOKING ASSISTANT
 # ════════════════════════════════════════════════════════════════════════════════════
 
+# Must be the first Streamlit call, before anything slow, so the page paints at once
 st.set_page_config(
     page_title="🏨 Travel Guide Chatbot | Hotels, Flights, Trains, Buses & Tours",
     page_icon="🏨",
@@ -59,6 +15,47 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+import os
+import functools
+import hmac
+import itertools
+import uuid
+from datetime import datetime
+
+
+from api_client import get_api_client
+from caching import get_semantic_cache
+from chat_pipeline import start_turn
+from history_store import get_history_store
+from travel_platforms import get_platform_suggestions, render_platform_cards
+from knowledge_base import get_knowledge_base
+from metrics import get_metrics
+from session_manager import Transcript, get_session_manager
+from startup import get_startup
+
+
+# Built once per server process and shared by every session and rerun;
+# rebuilt automatically when travel.csv or travel.pdf changes on disk.
+# The embedding model and index load on a background warm-up thread.
+# With CHATBOT_API_URL set the UI is a thin client: turns and history go through api_server.py
+api_client = get_api_client()
+startup = get_startup(api_client)
+startup.record("UI imports", time.perf_counter() - _import_start)
+knowledge_base = get_knowledge_base()
+metrics = get_metrics()
+# Caps each session's in-memory transcript and spills idle sessions under memory pressure
+sessions = get_session_manager()
+
+def admin_mode():
+    """Metrics panel for operators: CHATBOT_ADMIN=1 on the server, or ?admin=<ADMIN_TOKEN secret>"""
+    if os.environ.get("CHATBOT_ADMIN") == "1":
+        return True
+    token = st.secrets['ADMIN_TOKEN'] if 'ADMIN_TOKEN' in st.secrets else ""
+    given = st.query_params.get("admin", "")
+    return bool(token) and hmac.compare_digest(given.encode(), str(token).encode())
+
+ADMIN_MODE = admin_mode()
+
 # ════════════════════════════════════════════════════════════════════════════════════
 # 🎨 PREMIUM CSS STYLING FOR TRAVEL THEME
 # ════════════════════════════════════════════════════════════════════════════════════
@@ -218,219 +215,152 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ════════════════════════════════════════════════════════════════════════════════════
-# 🌍 TRAVEL PLATFORMS DATABASE
+# 💾 CHAT HISTORY FUNCTIONS
 # ════════════════════════════════════════════════════════════════════════════════════
 
-TRAVEL_PLATFORMS = {
-    "Hotels": [
-        {
-            "name": "Booking.com",
-            "description": "Global hotel booking platform with millions of properties, competitive rates, and no booking fees",
-            "url": "https://www.booking.com",
-            "icon": "🏨"
-        },
-        {
-            "name": "MakeMyTrip",
-            "description": "India's leading travel platform for hotels, flights, and packages with exclusive deals",
-            "url": "https://www.makemytrip.com",
-            "icon": "✈️"
-        },
-        {
-            "name": "Goibibo",
-            "description": "Popular Indian travel platform offering budget-friendly hotel and travel deals",
-            "url": "https://www.goibibo.com",
-            "icon": "🌟"
-        }
-    ],
-    "Train Tickets": [
-        {
-            "name": "IRCTC",
-            "description": "Official Indian Railways booking platform for train tickets across India",
-            "url": "https://www.irctc.co.in",
-            "icon": "🚂"
-        }
-    ],
-    "Bus Tickets": [
-        {
-            "name": "RedBus",
-            "description": "India's largest online bus booking platform with thousands of operators",
-            "url": "https://www.redbus.in",
-            "icon": "🚌"
-        }
-    ],
-    "Flight Tickets": [
-        {
-            "name": "MakeMyTrip Flights",
-            "description": "Comprehensive flight booking with all major airlines and competitive pricing",
-            "url": "https://www.makemytrip.com/flights",
-            "icon": "✈️"
-        },
-        {
-            "name": "Cleartrip",
-            "description": "Popular flight booking platform with real-time prices and instant confirmations",
-            "url": "https://www.cleartrip.com",
-            "icon": "🛫"
-        }
-    ],
-    "Tourist Places": [
-        {
-            "name": "TripAdvisor",
-            "description": "World's largest travel community with reviews, photos, and booking for attractions",
-            "url": "https://www.tripadvisor.in",
-            "icon": "🗺️"
-        }
-    ]
-}
+# Messages drawn per rerun; "Load earlier" pages in this many more
+TRANSCRIPT_WINDOW = 20
 
-# ════════════════════════════════════════════════════════════════════════════════════
-# 💾 CHAT HISTORY FUNCTIONS
-# ════════════════════════════════════════════════════════════════════════════════════
+def set_transcript(messages, offset=0, saved=None, replace=True):
+    """Replace the in-memory transcript; offset counts earlier messages left on disk.
+
+    replace=True (a new or cleared chat) makes the next save overwrite the stored log."""
+    st.session_state.transcript = Transcript(messages, offset, saved, replace)
+    st.session_state.transcript_window = TRANSCRIPT_WINDOW
 
-def create_history_directory():
-    """Create chat history directory"""
-    history_dir = Path("travel_guide_history")
-    history_dir.mkdir(exist_ok=True)
-    return history_dir
+def history_store():
+    """Local conversation store, or the API server's in thin-client mode"""
+    return api_client or get_history_store()
 
 def load_conversations_metadata():
     """Load conversation history"""
-    history_dir = create_history_directory()
-    conversations = {}
-    
-    for file in sorted(history_dir.glob("conversation_*.json"), reverse=True)[:20]:
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                conv_id = file.stem.replace("conversation_", "")
-                conversations[conv_id] = {
-                    "title": data.get("title", "Untitled"),
-                    "timestamp": data.get("timestamp", ""),
-                    "messages_count": len(data.get("messages", [])),
-                    "file": file
-                }
-        except:
-            pass
-    
-    return conversations
+    return history_store().list_conversations(limit=20)
 
 def create_new_conversation():
     """Create a new conversation"""
+    history_store().close(st.session_state.get("current_conversation_id"))
     conv_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
     st.session_state.current_conversation_id = conv_id
-    st.session_state.messages = [{
+    set_transcript([{
         "role": "assistant",
         "content": "🏨 **Welcome to Travel Guide Chatbot!** ✈️\n\nI'm here to help you with:\n\n🏨 **Hotel Booking** - Find and book hotels worldwide\n✈️ **Flight Tickets** - Compare and book flights\n🚂 **Train Tickets** - Book trains across India\n🚌 **Bus Tickets** - Reserve bus seats easily\n🗺️ **Tourist Places** - Discover attractions and reviews\n📋 **Trip Planning** - Get personalized travel itineraries\n\n**How I can help:**\n- Show trusted booking platforms with direct links\n- Personalize recommendations based on your city/destination\n- Help plan your complete trip\n- Answer all your travel queries\n\n💡 Example queries:\n- \"Book hotel in Mumbai\"\n- \"Flight tickets Delhi to Bangalore\"\n- \"Plan a 5-day trip to Goa\"\n- \"Tourist places in Kerala\"\n\nWhat's your travel need today? Let's get started! 🌍"
-    }]
+    }])
     st.rerun()
 
 def save_current_conversation():
-    """Save conversation to file"""
-    if len(st.session_state.messages) <= 1:
+    """Append new messages to the conversation log"""
+    transcript = st.session_state.transcript
+    offset, messages, replace = transcript.offset, transcript.messages, transcript.replace
+    if offset + len(messages) <= 1:
         return None
     
-    history_dir = create_history_directory()
     conv_id = st.session_state.get("current_conversation_id", datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3])
     
-    user_messages = [msg for msg in st.session_state.messages if msg["role"] == "user"]
-    if user_messages:
+    user_messages = [msg for msg in messages if msg["role"] == "user"]
+    if offset:
+        # The first question is on disk; keep the indexed title
+        first_question = None
+    elif user_messages:
         first_question = user_messages[0]["content"][:50] + ("..." if len(user_messages[0]["content"]) > 50 else "")
     else:
         first_question = "Travel Chat"
     
-    data = {
-        "id": conv_id,
-        "title": first_question,
-        "timestamp": datetime.now().isoformat(),
-        "messages": st.session_state.messages,
-        "model": st.session_state.get("model", "llama-3.1-8b-instant")
-    }
-    
-    filepath = history_dir / f"conversation_{conv_id}.json"
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    return filepath
+    path = history_store().save(
+        conv_id,
+        first_question,
+        datetime.now().isoformat(),
+        messages,
+        st.session_state.get("model", "llama-3.1-8b-instant"),
+        offset=offset,
+        replace=replace
+    )
+    transcript.mark_saved()
+    return path
+
+def release_conversation():
+    """Callable that closes this session's log once the session is spilled or ends"""
+    return functools.partial(history_store().close, st.session_state.get("current_conversation_id"))
 
 def load_conversation(conv_id):
-    """Load a saved conversation"""
-    history_dir = create_history_directory()
-    filepath = history_dir / f"conversation_{conv_id}.json"
-    
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            st.session_state.current_conversation_id = conv_id
-            st.session_state.messages = data.get("messages", [])
-            st.rerun()
-    except:
+    """Load the most recent window of a saved conversation"""
+    loaded = history_store().load_tail(conv_id, TRANSCRIPT_WINDOW)
+    if loaded is None:
         st.error("Failed to load conversation")
+        return
+    
+    history_store().close(st.session_state.get("current_conversation_id"))
+    st.session_state.current_conversation_id = conv_id
+    offset, messages = loaded
+    set_transcript(messages, offset, saved=offset + len(messages), replace=False)
+    st.rerun()
 
 def delete_conversation(conv_id):
     """Delete a conversation"""
-    history_dir = create_history_directory()
-    filepath = history_dir / f"conversation_{conv_id}.json"
-    
     try:
-        filepath.unlink()
+        history_store().delete(conv_id)
         if st.session_state.get("current_conversation_id") == conv_id:
             create_new_conversation()
-    except:
+    except OSError:
         st.error("Failed to delete")
 
 # ════════════════════════════════════════════════════════════════════════════════════
-# 🎯 PLATFORM SUGGESTION FUNCTIONS
+# 📜 TRANSCRIPT FUNCTIONS
 # ════════════════════════════════════════════════════════════════════════════════════
 
-def format_platform_suggestion(category, platforms):
-    """Format platform suggestions nicely"""
-    output = f"\n### {TRAVEL_PLATFORMS[category][0]['icon']} {category.upper()}\n\n"
-    
-    for idx, platform in enumerate(platforms, 1):
-        output += f"**{idx}. {platform['name']}**\n"
-        output += f"   📝 {platform['description']}\n"
-        output += f"   🔗 [{platform['url']}]({platform['url']})\n\n"
-    
-    return output
-
-def get_platform_suggestions(user_query):
-    """Extract travel needs and return relevant platforms"""
-    query_lower = user_query.lower()
-    suggestions = {}
-    
-    # Hotel booking detection
-    if any(word in query_lower for word in ['hotel', 'room', 'accommodation', 'stay', 'book hotel', 'accommodation']):
-        suggestions['Hotels'] = TRAVEL_PLATFORMS['Hotels']
-    
-    # Train booking detection
-    if any(word in query_lower for word in ['train', 'railway', 'irctc', 'ticket', 'book train']):
-        suggestions['Train Tickets'] = TRAVEL_PLATFORMS['Train Tickets']
-    
-    # Bus booking detection
-    if any(word in query_lower for word in ['bus', 'coach', 'redbus', 'book bus']):
-        suggestions['Bus Tickets'] = TRAVEL_PLATFORMS['Bus Tickets']
-    
-    # Flight booking detection
-    if any(word in query_lower for word in ['flight', 'air', 'plane', 'book flight', 'fly', 'ticket']):
-        suggestions['Flight Tickets'] = TRAVEL_PLATFORMS['Flight Tickets']
-    
-    # Tourist places detection
-    if any(word in query_lower for word in ['tourist', 'attraction', 'place', 'visit', 'see', 'trip', 'itinerary', 'plan']):
-        suggestions['Tourist Places'] = TRAVEL_PLATFORMS['Tourist Places']
-    
-    return suggestions
+def load_earlier_messages():
+    """Widen the transcript window by one page"""
+    st.session_state.transcript_window += TRANSCRIPT_WINDOW
+
+def get_visible_messages(first_visible):
+    """Messages from position first_visible on, paging older ones in from disk"""
+    transcript = st.session_state.transcript
+    offset = transcript.offset
+    in_memory = transcript.messages[max(0, first_visible - offset):]
+    if first_visible >= offset:
+        return in_memory
+    
+    cached_start, cached = transcript.earlier
+    if first_visible < cached_start:
+        older = history_store().read_messages(
+            st.session_state.current_conversation_id, first_visible, cached_start
+        )
+        cached_start, cached = first_visible, older + cached
+        transcript.earlier = (cached_start, cached)
+    return cached[first_visible - cached_start:] + in_memory
+
+@functools.lru_cache(maxsize=4096)
+def message_markdown(content, ttft=None, total=None):
+    """Markdown for one chat message, built once per message"""
+    if total is None:
+        return content
+    if ttft is None:
+        # Turns that failed before their first token only have a total
+        ttft = total
+    return f"{content}\n\n*⏱️ First token {ttft:.2f}s • Total {total:.2f}s*"
 
 # ════════════════════════════════════════════════════════════════════════════════════
 
 # Initialize Session State
-if "messages" not in st.session_state:
-    st.session_state.messages = [{
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+
+if "transcript" not in st.session_state:
+    set_transcript([{
         "role": "assistant",
         "content": "🏨 **Welcome to Travel Guide Chatbot!** ✈️\n\nI'm here to help with:\n\n🏨 Hotel Booking • ✈️ Flights • 🚂 Trains • 🚌 Buses • 🗺️ Tourist Places • 📋 Trip Planning\n\nWhat would you like to book or plan? 🌍"
-    }]
+    }])
 
 if "current_conversation_id" not in st.session_state:
     st.session_state.current_conversation_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
 
+# An idle session's saved messages may have been spilled; bring back the latest window
+if st.session_state.transcript.spilled:
+    st.session_state.transcript.restore(
+        *(history_store().load_tail(st.session_state.current_conversation_id, TRANSCRIPT_WINDOW)
+          or (st.session_state.transcript.offset, []))
+    )
+sessions.touch(st.session_state.session_id, st.session_state.transcript, release_conversation())
+
 # ════════════════════════════════════════════════════════════════════════════════════
 # 🎨 HEADER
 # ════════════════════════════════════════════════════════════════════════════════════
@@ -530,6 +460,45 @@ with st.sidebar:
     
     os.environ['GROQ_API_KEY'] = groq_api
     
+    cache_stats = knowledge_base.search_cache.stats()
+    st.caption(f"⚡ Search cache: {cache_stats['hits']} hits • {cache_stats['misses']} misses")
+    
+    with st.expander("🚀 Startup report"):
+        st.caption(f"Status: {startup.stage}")
+        for stage, seconds in startup.report():
+            st.caption(f"{seconds:.3f}s • {stage}")
+    
+    if ADMIN_MODE:
+        with st.expander("📊 Metrics (admin)"):
+            st.dataframe(
+                [
+                    {"metric": name.removeprefix("travel_"), "labels": labels, "count": count,
+                     "mean": round(mean, 4), "p50 ≤": p50, "p95 ≤": p95, "p99 ≤": p99}
+                    for name, labels, count, mean, p50, p95, p99 in metrics.summary()
+                ],
+                hide_index=True,
+            )
+            for name, labels, value in metrics.counters():
+                st.caption(f"{labels or name}: {value}")
+            st.download_button("⬇️ Prometheus export", metrics.prometheus_text(),
+                               file_name="metrics.txt", mime="text/plain")
+            usage = sessions.usage()
+            st.caption(f"🧠 {len(usage)} sessions • {sum(row[1] for row in usage) / 1e6:.2f} MB of transcripts")
+            st.dataframe(
+                [
+                    {"session": session_id, "KB": round(size / 1024, 1), "messages": count, "idle s": round(idle)}
+                    for session_id, size, count, idle in usage
+                ],
+                hide_index=True,
+            )
+            if st.session_state.get("profile_next_turn"):
+                st.caption("🔬 Your next message will be profiled")
+            else:
+                st.button("🔬 Profile my next message",
+                          on_click=lambda: st.session_state.update(profile_next_turn=True))
+            if st.session_state.get("last_profile"):
+                st.caption(f"Last profile: {st.session_state.last_profile}")
+    
     st.divider()
     
     # Model Selection
@@ -543,10 +512,10 @@ with st.sidebar:
     st.divider()
     
     if st.button("🧹 Clear Chat", use_container_width=True):
-        st.session_state.messages = [{
+        set_transcript([{
             "role": "assistant",
             "content": "✨ Chat cleared! Ready for your next travel query. 🌍"
-        }]
+        }])
         st.rerun()
     
     st.divider()
@@ -558,92 +527,86 @@ with st.sidebar:
 # 💬 CHAT INTERFACE
 # ════════════════════════════════════════════════════════════════════════════════════
 
-client = Groq(api_key=os.environ.get('GROQ_API_KEY', ''))
+# Display Chat Messages: only the latest window, so reruns stay flat as chats grow
+total_messages = st.session_state.transcript.total
+first_visible = max(0, total_messages - st.session_state.transcript_window)
+if first_visible > 0:
+    st.button(f"⬆️ Load earlier messages ({first_visible} more)", on_click=load_earlier_messages,
+              use_container_width=True)
 
-# Display Chat Messages
-for message in st.session_state.messages:
-    with st.chat_message(message["role"], avatar="🏨" if message["role"] == "assistant" else "👤"):
-        st.markdown(message["content"])
+with metrics.timer("render_transcript"):
+    for message in get_visible_messages(first_visible):
+        timings = message.get("timings") or {}
+        with st.chat_message(message["role"], avatar="🏨" if message["role"] == "assistant" else "👤"):
+            st.markdown(message_markdown(message["content"], timings.get("ttft"), timings.get("total")))
 
 # Main Response Function
 def generate_response():
-    try:
-        # Last user question
-        user_query = st.session_state.messages[-1]["content"]
-
-        # 🔥 RAG SEARCH (CSV + PDF)
-        rag_context = rag_search(user_query)
-
-        system_prompt = f"""
-You are Travel Guide Chatbot.
-
-Use this DATA if relevant:
-{rag_context}
-
-Rules:
-- Simple English
-- Friendly
-- If city mentioned, explain using dataset first
-- If not found in dataset, answer normally
-- Help with hotels, trips, tourist places
-
-User Question:
-{user_query}
-"""
-
-        response = client.chat.completions.create(
-            model=selected_model,
-            messages=[{"role": "user", "content": system_prompt}],
-            temperature=0.4,
-            max_tokens=900
-        )
-
-        return response.choices[0].message.content
+    """Start answering the last user message on the async pipeline"""
+    history = st.session_state.transcript.messages
+    user_query = history[-1]["content"]
+    profile = st.session_state.pop("profile_next_turn", False)
+    if api_client is not None:
+        return api_client.start_turn(user_query, selected_model, groq_api, history[:-1], profile=profile)
+    return start_turn(user_query, selected_model, groq_api, knowledge_base,
+                      get_platform_suggestions, get_semantic_cache(), history[:-1],
+                      profile=profile)
+
+# Warm-up status: chat stays disabled until the retrieval stack is loaded
+@st.fragment(run_every=1.0)
+def warm_up_status():
+    """Poll the warm-up thread and rerun the app once it is done"""
+    if startup.ready.is_set():
+        st.rerun()
+    st.info(f"🔄 Warming up the travel knowledge base… ({startup.stage})", icon="⏳")
 
-    except Exception as e:
-        return f"⚠️ Error: {str(e)}"
+app_ready = startup.ready.is_set()
+if not app_ready:
+    warm_up_status()
+elif startup.error is not None:
+    st.warning("⚠️ Travel data could not be loaded; answers will not use the guide.")
 
 # Chat Input
-if prompt := st.chat_input("🏨 Book hotel, flights, plan trip... Ask anything! 🌍", disabled=not groq_api):
-    st.session_state.messages.append({"role": "user", "content": prompt})
+if prompt := st.chat_input("🏨 Book hotel, flights, plan trip... Ask anything! 🌍",
+                            disabled=not groq_api or not app_ready):
+    st.session_state.transcript.append({"role": "user", "content": prompt})
     
     with st.chat_message("user", avatar="👤"):
         st.markdown(prompt)
     
-    # Get platform suggestions based on query
-    platform_suggestions = get_platform_suggestions(prompt)
+    # A new message supersedes any turn still streaming for this session
+    previous_turn = st.session_state.get("active_turn")
+    if previous_turn is not None:
+        previous_turn.cancel()
+    
+    # Retrieval and platform matching run concurrently, then the answer streams
+    turn = generate_response()
+    st.session_state.active_turn = turn
     
     with st.chat_message("assistant", avatar="🏨"):
-        # Generate AI response
+        # Generate AI response, rendering tokens as they arrive
+        token_stream = turn.tokens()
         with st.spinner("✈️ Finding travel options..."):
-            ai_response = generate_response()
-            st.markdown(ai_response)
+            first_chunk = next(token_stream, "")
+        ai_response = st.write_stream(itertools.chain([first_chunk], token_stream))
+        platform_suggestions = turn.platforms
+        turn_timings = {
+            "ttft": round(turn.timings.get("ttft", turn.timings.get("total", 0.0)), 3),
+            "total": round(turn.timings.get("total", 0.0), 3),
+        }
+        st.caption(f"⏱️ First token {turn_timings['ttft']:.2f}s • Total {turn_timings['total']:.2f}s")
         
-        # Show platform suggestions if any
+        # Show platform suggestions if any, as one prebuilt block
         if platform_suggestions:
-            st.divider()
-            st.markdown("### 🔗 **Booking Platforms** 👇")
-            
-            for category, platforms in platform_suggestions.items():
-                st.markdown(f"**{category}:**")
-                
-                for idx, platform in enumerate(platforms, 1):
-                    with st.container():
-                        col_name, col_link = st.columns([0.4, 0.6])
-                        
-                        with col_name:
-                            st.markdown(f"**{idx}. {platform['name']}**")
-                        
-                        with col_link:
-                            st.markdown(f"[🔗 Open Website]({platform['url']})")
-                        
-                        st.caption(f"   📝 {platform['description']}")
-                        st.divider()
-            
-            st.info("💡 Click the links above to book directly on official websites!", icon='👆')
-    
-    st.session_state.messages.append({"role": "assistant", "content": ai_response})
-    save_current_conversation()
+            with metrics.timer("render_cards"):
+                st.markdown(render_platform_cards(tuple(platform_suggestions)), unsafe_allow_html=True)
+    
+    if turn.profile_path is not None:
+        st.session_state.last_profile = str(turn.profile_path)
+    st.session_state.transcript.append({"role": "assistant", "content": ai_response, "timings": turn_timings})
+    with metrics.timer("save_history"):
+        save_current_conversation()
+    sessions.touch(st.session_state.session_id, st.session_state.transcript, release_conversation())
 
 # Footer
 st.markdown("""
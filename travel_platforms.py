@@ -0,0 +1,126 @@
+"""Booking platforms and the keyword table that maps queries onto them"""
+import html
+from functools import lru_cache
+
+from intent_matcher import IntentMatcher
+
+TRAVEL_PLATFORMS = {
+    "Hotels": [
+        {
+            "name": "Booking.com",
+            "description": "Global hotel booking platform with millions of properties, competitive rates, and no booking fees",
+            "url": "https://www.booking.com",
+            "icon": "🏨"
+        },
+        {
+            "name": "MakeMyTrip",
+            "description": "India's leading travel platform for hotels, flights, and packages with exclusive deals",
+            "url": "https://www.makemytrip.com",
+            "icon": "✈️"
+        },
+        {
+            "name": "Goibibo",
+            "description": "Popular Indian travel platform offering budget-friendly hotel and travel deals",
+            "url": "https://www.goibibo.com",
+            "icon": "🌟"
+        }
+    ],
+    "Train Tickets": [
+        {
+            "name": "IRCTC",
+            "description": "Official Indian Railways booking platform for train tickets across India",
+            "url": "https://www.irctc.co.in",
+            "icon": "🚂"
+        }
+    ],
+    "Bus Tickets": [
+        {
+            "name": "RedBus",
+            "description": "India's largest online bus booking platform with thousands of operators",
+            "url": "https://www.redbus.in",
+            "icon": "🚌"
+        }
+    ],
+    "Flight Tickets": [
+        {
+            "name": "MakeMyTrip Flights",
+            "description": "Comprehensive flight booking with all major airlines and competitive pricing",
+            "url": "https://www.makemytrip.com/flights",
+            "icon": "✈️"
+        },
+        {
+            "name": "Cleartrip",
+            "description": "Popular flight booking platform with real-time prices and instant confirmations",
+            "url": "https://www.cleartrip.com",
+            "icon": "🛫"
+        }
+    ],
+    "Tourist Places": [
+        {
+            "name": "TripAdvisor",
+            "description": "World's largest travel community with reviews, photos, and booking for attractions",
+            "url": "https://www.tripadvisor.in",
+            "icon": "🗺️"
+        }
+    ]
+}
+
+# Words and phrases that signal each category. Matching is whole-word and
+# stemmed ("hotels", "booking" and "buses" all match), so list base forms.
+INTENT_KEYWORDS = {
+    "Hotels": [
+        "hotel", "room", "accommodation", "stay", "resort", "hostel", "homestay",
+        "lodge", "guest house", "होटल",
+    ],
+    "Train Tickets": [
+        "train", "railway", "rail", "irctc", "ticket", "tatkal", "ट्रेन",
+    ],
+    "Bus Tickets": [
+        "bus", "coach", "redbus", "बस",
+    ],
+    "Flight Tickets": [
+        "flight", "air", "airline", "airport", "airfare", "plane", "fly", "ticket", "फ्लाइट",
+    ],
+    "Tourist Places": [
+        "tourist", "attraction", "place", "visit", "see", "sightseeing", "trip",
+        "itinerary", "plan", "tour",
+    ],
+}
+
+# Built once per process
+intent_matcher = IntentMatcher(INTENT_KEYWORDS)
+
+
+def get_platform_suggestions(user_query):
+    """Extract travel needs and return relevant platforms"""
+    return {
+        category: TRAVEL_PLATFORMS[category]
+        for category in intent_matcher.match(user_query)
+    }
+
+
+def _category_card(category):
+    """HTML card listing one category's platforms"""
+    rows = "".join(
+        '<div style="display: flex; justify-content: space-between; gap: 12px;">'
+        f'<strong>{idx}. {html.escape(platform["name"])}</strong>'
+        f'<a href="{html.escape(platform["url"])}" target="_blank">🔗 Open Website</a>'
+        '</div>'
+        f'<div style="font-size: 0.85em; opacity: 0.8; margin: 2px 0 12px 0;">📝 {html.escape(platform["description"])}</div>'
+        for idx, platform in enumerate(TRAVEL_PLATFORMS[category], 1)
+    )
+    return f'<div class="platform-card"><p><strong>{html.escape(category)}:</strong></p>{rows}</div>'
+
+
+# TRAVEL_PLATFORMS is static, so each card is rendered once at import
+CATEGORY_CARDS = {category: _category_card(category) for category in TRAVEL_PLATFORMS}
+
+
+@lru_cache(maxsize=1024)
+def render_platform_cards(categories):
+    """One prebuilt HTML block for a tuple of matched categories"""
+    return (
+        "<hr><h3>🔗 <strong>Booking Platforms</strong> 👇</h3>"
+        + "".join(CATEGORY_CARDS[category] for category in categories)
+        + '<div class="platform-card">👆 💡 Click the links above to book directly on official websites!</div>'
+    )
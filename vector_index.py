@@ -0,0 +1,217 @@
+"""Compact FAISS index modes (HNSW + 8-bit scalar quantization, IVF-PQ) for large corpora"""
+import os
+import time
+
+# flat (exact, float32), hnsw_sq (graph over 8-bit codes, ~3x smaller at 768
+# dimensions) or ivfpq (inverted lists over product-quantized codes, ~25x smaller)
+INDEX_MODE = os.environ.get("INDEX_MODE", "flat")
+# Below this many vectors a compact mode isn't worth the recall it costs
+INDEX_MIN_DOCUMENTS = int(os.environ.get("INDEX_MIN_DOCUMENTS", "20000"))
+# Vectors sampled to train the quantizers
+INDEX_TRAIN_SIZE = int(os.environ.get("INDEX_TRAIN_SIZE", "100000"))
+
+# Build-time settings (part of the index hash)
+HNSW_M = int(os.environ.get("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("HNSW_EF_CONSTRUCTION", "80"))
+IVF_NLIST = int(os.environ.get("IVF_NLIST", "0"))  # 0 = about 4 * sqrt(vectors)
+PQ_M = int(os.environ.get("PQ_M", "0"))  # 0 = one byte per 8 dimensions
+
+# Query-time settings: higher = better recall, slower search
+HNSW_EF_SEARCH = int(os.environ.get("HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "16"))
+
+INDEX_MODES = ("flat", "hnsw_sq", "ivfpq")
+# PQ codebooks have 256 centroids each, so training needs comfortably more vectors
+MIN_TRAIN_VECTORS = 1024
+# Vectors reconstructed from the flat index and added per step while compacting
+COPY_BATCH = 65536
+
+
+def build_settings(mode=INDEX_MODE):
+    """Settings that change what a built index contains"""
+    if mode == "hnsw_sq":
+        return f"hnsw_sq:{HNSW_M}:{HNSW_EF_CONSTRUCTION}"
+    if mode == "ivfpq":
+        return f"ivfpq:{IVF_NLIST}:{PQ_M}"
+    return "flat"
+
+
+def index_kind(index):
+    """INDEX_MODES name of a FAISS index"""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw_sq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def supports_removal(index):
+    """Whether LangChain's FAISS.delete keeps its id mapping right for this index.
+
+    HNSW can't remove vectors, and IVF removes them without renumbering the
+    rest, so delete_documents copies those instead."""
+    return index_kind(index) == "flat"
+
+
+def _pq_m(dimension):
+    """Sub-quantizer count: PQ_M, else about one byte per 8 dimensions, dividing the dimension"""
+    m = PQ_M or max(1, dimension // 8)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def _factory_string(mode, dimension, count):
+    if mode == "hnsw_sq":
+        return f"HNSW{HNSW_M},SQ8"
+    nlist = IVF_NLIST or int(4 * count ** 0.5)
+    # k-means wants at least ~39 training points per list
+    nlist = max(1, min(nlist, count // 39))
+    return f"IVF{nlist},PQ{_pq_m(dimension)}"
+
+
+def configure_search(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Set the recall/latency knobs on a loaded index (flat indexes have none)"""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+
+
+def compact_index(flat, mode=INDEX_MODE):
+    """Train a compact index on the flat index's vectors and copy them into it.
+
+    Positions are kept, so LangChain's index_to_docstore_id still lines up.
+    Returns the flat index unchanged when the mode is flat or it is too small."""
+    import faiss
+    import numpy as np
+
+    count = flat.ntotal
+    if mode == "flat" or count < max(INDEX_MIN_DOCUMENTS, MIN_TRAIN_VECTORS):
+        return flat
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown INDEX_MODE {mode!r}, expected one of {INDEX_MODES}")
+
+    start = time.perf_counter()
+    factory = _factory_string(mode, flat.d, count)
+    index = faiss.index_factory(flat.d, factory, faiss.METRIC_L2)
+    if mode == "hnsw_sq":
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(count, size=min(count, INDEX_TRAIN_SIZE), replace=False))
+    index.train(np.vstack([flat.reconstruct(int(i)) for i in sample]).astype("float32"))
+    for first in range(0, count, COPY_BATCH):
+        index.add(flat.reconstruct_n(first, min(COPY_BATCH, count - first)))
+    configure_search(index)
+    print(f"Compacted {count} vectors into {factory} in {time.perf_counter() - start:.1f}s 🗜️")
+    return index
+
+
+def flat_index(index):
+    """Exact index of a compact index's decoded vectors, in the same positions.
+
+    Used to recompact with other build settings without re-embedding; the
+    vectors keep the first quantization's error."""
+    import faiss
+
+    source = faiss.downcast_index(index)
+    if isinstance(source, faiss.IndexIVF):
+        source.make_direct_map()
+    flat = faiss.IndexFlatL2(source.d)
+    for first in range(0, source.ntotal, COPY_BATCH):
+        flat.add(source.reconstruct_n(first, min(COPY_BATCH, source.ntotal - first)))
+    return flat
+
+
+def _copy_ivf_lists(source, index, keep):
+    """Copy the codes at positions keep into an empty clone, renumbered from 0.
+
+    Re-encoding decoded IVF-PQ vectors could move some to another list and
+    change them; copying the stored codes keeps every vector exactly as it was."""
+    import faiss
+    import numpy as np
+
+    index.make_direct_map(False)
+    renumber = np.full(source.ntotal, -1, dtype="int64")
+    renumber[keep] = np.arange(len(keep), dtype="int64")
+    lists, code_size = source.invlists, source.invlists.code_size
+    for list_no in range(source.nlist):
+        size = lists.list_size(list_no)
+        if not size:
+            continue
+        ids = renumber[faiss.rev_swig_ptr(lists.get_ids(list_no), size)]
+        codes = faiss.rev_swig_ptr(lists.get_codes(list_no), size * code_size).reshape(size, code_size)
+        kept = ids >= 0
+        if kept.any():
+            new_ids = np.ascontiguousarray(ids[kept])
+            new_codes = np.ascontiguousarray(codes[kept])
+            index.invlists.add_entries(list_no, len(new_ids), faiss.swig_ptr(new_ids),
+                                       faiss.swig_ptr(new_codes))
+    index.ntotal = len(keep)
+
+
+def delete_documents(db, doc_ids):
+    """Remove documents from a LangChain FAISS store, whatever its index kind.
+
+    A compact index is copied without them into an empty clone of the
+    trained index, so nothing is re-embedded or retrained, and the positions
+    shift down just as FAISS.delete renumbers a flat index. IVF lists are
+    copied code for code; HNSW vectors are decoded and re-encoded."""
+    import faiss
+    import numpy as np
+
+    if supports_removal(db.index):
+        db.delete(doc_ids)
+        return
+    start = time.perf_counter()
+    doc_ids = set(doc_ids)
+    mapping = db.index_to_docstore_id
+    keep = np.array([position for position in range(db.index.ntotal) if mapping[position] not in doc_ids],
+                    dtype="int64")
+
+    source = faiss.downcast_index(db.index)
+    index = faiss.clone_index(source)
+    # reset() drops the vectors but keeps what training learned
+    index.reset()
+    if isinstance(index, faiss.IndexIVF):
+        _copy_ivf_lists(source, index, keep)
+    else:
+        for first in range(0, len(keep), COPY_BATCH):
+            index.add(source.reconstruct_batch(keep[first:first + COPY_BATCH]))
+    configure_search(index)
+
+    db.index = index
+    db.index_to_docstore_id = {new: mapping[int(old)] for new, old in enumerate(keep)}
+    db.docstore.delete(list(doc_ids))
+    print(f"Removed {len(doc_ids)} vectors from the {index_kind(index)} index "
+          f"in {time.perf_counter() - start:.1f}s 🗜️")
+
+
+def index_bytes(index):
+    """Serialized size of an index, roughly what it costs in memory"""
+    import faiss
+
+    return len(faiss.serialize_index(index))
+
+
+def recall_at_k(exact, index, queries, k):
+    """Share of the exact top-k neighbours that the compact index also returns.
+
+    A result as close as the k-th exact neighbour counts as a hit, so ties
+    between duplicate vectors don't depress the score."""
+    distances, _ = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    hits = 0
+    for query, ids, limit in zip(queries, found, distances[:, -1]):
+        ids = ids[ids >= 0]
+        if len(ids):
+            true = ((exact.reconstruct_batch(ids) - query) ** 2).sum(axis=1)
+            hits += int((true <= limit * (1 + 1e-5) + 1e-6).sum())
+    return hits / distances.size